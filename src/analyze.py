@@ -0,0 +1,206 @@
+"""Summarizes the output files of many sessions.
+
+    python analyze.py DATA_DIRECTORY [--workers N] [--output-directory DIR]
+
+Every output file holds the participant ID, the comma separated trial
+durations in ms and the comma separated number of correct clicks per trial.
+The parsed files are cached by the hash of their content, so a re-run only
+parses the files which are new or changed.
+"""
+import argparse
+import hashlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config import NUMBER_OF_DOTS, OUTPUT_FILE, TRIAL_DICTIONARY
+
+CACHE_DIRECTORY = '.analysis_cache'
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+
+def find_output_files(directory, name=OUTPUT_FILE):
+    """Returns the sorted paths of every output file below directory.
+    """
+    paths = []
+    for root, directories, files in os.walk(directory):
+        if name in files:
+            paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+def parse_output_file(path):
+    """Reads an output file.
+    Returns:
+        participant: the participant ID.
+        durations: an array of the trial durations in ms.
+        correct: an array of the number of correct clicks per trial.
+    """
+    with open(path) as f:
+        lines = f.read().splitlines()
+    participant = lines[0]
+    durations = np.array([float(x) for x in lines[1].split(',') if x], dtype=float)
+    correct = np.array([int(x) for x in lines[2].split(',') if x], dtype=int)
+    return participant, durations, correct
+
+
+def load_output_file(path, cache_directory):
+    """Parses an output file or reads it from the cache.
+    Returns:
+        the same values as parse_output_file.
+    """
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    cached = os.path.join(cache_directory, digest + '.npz')
+    if os.path.exists(cached):
+        with np.load(cached) as data:
+            return str(data['participant']), data['durations'], data['correct']
+    participant, durations, correct = parse_output_file(path)
+    temporary = cached + '.{}.tmp.npz'.format(os.getpid())
+    np.savez(temporary, participant=participant, durations=durations, correct=correct)
+    os.replace(temporary, cached)
+    return participant, durations, correct
+
+
+def capacity(correct, load, number_of_dots):
+    """Estimates the number of tracked dots from the number of correct
+    clicks. A participant who tracked k of the load targets finds them and
+    guesses the remaining load - k clicks among the number_of_dots - k other
+    dots, which solves to k = (C * M - T^2) / (M + C - 2 * T). Where the
+    denominator is not positive no k explains C, e.g. 0 correct clicks of 5
+    among 10 dots, and the estimate is nan. Otherwise it is clamped to
+    [0, T], the clicks may be worse than guessing.
+    Args:
+        correct: the mean number of correct clicks C.
+        load: the number of tracked dots T.
+        number_of_dots: the number of dots on the screen M.
+    Returns:
+        k: the estimated number of tracked dots.
+    """
+    denominator = number_of_dots + correct - 2 * load
+    if denominator <= 0:
+        return float('nan')
+    return float(np.clip((correct * number_of_dots - load**2) / denominator, 0, load))
+
+
+def summarize_participant(path, cache_directory, loads, number_of_dots):
+    """Loads one output file and computes the per-load summary of the
+    participant. Runs in a worker process.
+    Returns:
+        rows: a list of dictionaries, one per load.
+        trials: the participant, loads, durations and correct arrays of
+        the trials which were completed.
+    """
+    participant, durations, correct = load_output_file(path, cache_directory)
+    count = min(len(durations), len(correct), len(loads))
+    durations, correct, trial_loads = durations[:count], correct[:count], loads[:count]
+    rows = []
+    for load in np.unique(trial_loads):
+        selected = trial_loads == load
+        mean_correct = correct[selected].mean()
+        rows.append({'participant': participant,
+                     'file': path,
+                     'load': int(load),
+                     'trials': int(selected.sum()),
+                     'accuracy': mean_correct / load,
+                     'rt_median_ms': np.median(durations[selected]),
+                     'rt_mean_ms': durations[selected].mean(),
+                     'capacity': capacity(mean_correct, load, number_of_dots)})
+    return rows, (participant, trial_loads, durations, correct)
+
+
+def summarize_loads(trials, number_of_dots):
+    """Pools the trials of every participant by load.
+    Args:
+        trials: the trials returned by summarize_participant.
+    Returns:
+        rows: a list of dictionaries, one per load.
+    """
+    loads = np.concatenate([trial[1] for trial in trials])
+    durations = np.concatenate([trial[2] for trial in trials])
+    correct = np.concatenate([trial[3] for trial in trials])
+    rows = []
+    for load in np.unique(loads):
+        selected = loads == load
+        accuracy = correct[selected] / load
+        row = {'load': int(load),
+               'participants': sum(int(np.any(trial[1] == load)) for trial in trials),
+               'trials': int(selected.sum()),
+               'accuracy': accuracy.mean(),
+               'accuracy_sd': accuracy.std(),
+               'capacity': capacity(correct[selected].mean(), load, number_of_dots)}
+        for quantile, value in zip(QUANTILES, np.quantile(durations[selected], QUANTILES)):
+            row['rt_q{:02.0f}_ms'.format(quantile * 100)] = value
+        rows.append(row)
+    return rows
+
+
+def write_csv(rows, f):
+    if not rows:
+        return
+    fields = list(rows[0])
+    f.write(",".join(fields))
+    f.write('\n')
+    for row in rows:
+        f.write(",".join(format(row[field], '.4f') if isinstance(row[field], float)
+                         else str(row[field]) for field in fields))
+        f.write('\n')
+
+
+def analyze(directory, workers=None, cache_directory=CACHE_DIRECTORY,
+            number_of_dots=NUMBER_OF_DOTS, trial_dictionary=TRIAL_DICTIONARY):
+    """Summarizes every output file below directory in a process pool.
+    Returns:
+        participant_rows: the per participant and load summaries.
+        load_rows: the per load summaries over all participants.
+    """
+    os.makedirs(cache_directory, exist_ok=True)
+    loads = np.array([trial_dictionary[trial] for trial in sorted(trial_dictionary)])
+    paths = find_output_files(directory)
+    if not paths:
+        return [], []
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(paths) // (4 * workers))
+    participant_rows = []
+    trials = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(summarize_participant, paths,
+                               [cache_directory] * len(paths),
+                               [loads] * len(paths),
+                               [number_of_dots] * len(paths),
+                               chunksize=chunksize)
+        for rows, participant_trials in results:
+            participant_rows.extend(rows)
+            trials.append(participant_trials)
+    return participant_rows, summarize_loads(trials, number_of_dots)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('directory', help='the directory searched for output files')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='the number of worker processes')
+    parser.add_argument('--cache-directory', default=CACHE_DIRECTORY)
+    parser.add_argument('--dots', type=int, default=NUMBER_OF_DOTS,
+                        help='the number of dots shown in every trial')
+    parser.add_argument('--output-directory', default=None,
+                        help='writes participants.csv and loads.csv there '
+                             'instead of printing the load summary')
+    args = parser.parse_args(argv)
+
+    participant_rows, load_rows = analyze(args.directory, args.workers,
+                                          args.cache_directory, args.dots)
+    if args.output_directory is None:
+        write_csv(load_rows, sys.stdout)
+        return
+    os.makedirs(args.output_directory, exist_ok=True)
+    with open(os.path.join(args.output_directory, 'participants.csv'), 'w') as f:
+        write_csv(participant_rows, f)
+    with open(os.path.join(args.output_directory, 'loads.csv'), 'w') as f:
+        write_csv(load_rows, f)
+
+
+if __name__ == '__main__':
+    main()
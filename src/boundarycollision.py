@@ -1,3 +1,5 @@
+import numpy as np
+
 class BoundaryCollisionDetector:
     def __init__(self, boundary):
         self.boundary = boundary
@@ -42,3 +44,73 @@ class BoundaryCollisionDetector:
                 entity.velocity = entity.velocity[0] * -1, entity.velocity[1] * -1
         else:
             return
+
+    def detect_collisions(self, centers, radius):
+        """Batched version of detect_collision for an array of centers.
+        Args:
+            centers: an (n, 2) array of entity centers.
+            radius: the radius shared by every entity.
+        Returns:
+            collision_types: an (n,) integer array using the same encoding as
+            detect_collision.
+        """
+        top_collision = (self.boundary.HEIGHT - centers[..., 1] <= radius)
+        bottom_collision = (centers[..., 1] <= radius)
+        left_collision = (centers[..., 0] <= radius)
+        right_collision = (self.boundary.WIDTH - centers[..., 0] <= radius)
+        return 4 * top_collision.astype(int) + 4 * bottom_collision + \
+                1 * left_collision + 1 * right_collision
+
+    def reflect_velocities(self, velocities, collision_types):
+        """Flips the velocity components in place following the same rules as
+        update_velocity.
+        Args:
+            velocities: an (n, 2) array of entity velocities.
+            collision_types: an (n,) array returned by detect_collisions.
+        """
+        multiple = collision_types > 4
+        velocities[..., 0][(collision_types == 1) | multiple] *= -1
+        velocities[..., 1][(collision_types == 4) | multiple] *= -1
+
+    def update_velocities(self, centers, velocities, radius):
+        """Batched version of update_velocity. The velocities are updated in
+        place.
+        Args:
+            centers: an (n, 2) array of entity centers.
+            velocities: an (n, 2) array of entity velocities.
+            radius: the radius shared by every entity.
+        """
+        self.reflect_velocities(velocities, self.detect_collisions(centers, radius))
+
+    def sweep(self, centers, velocities, dt, radius):
+        """Moves every entity in a straight line for dt and reflects it off
+        the boundary at the exact time it touches it, so that no entity goes
+        through a wall or stays in one, however far it moves in a step. The
+        axes are independent, so a corner reflects both components. Both
+        arrays are updated in place.
+        Args:
+            centers: an (..., 2) array of entity centers.
+            velocities: an (..., 2) array of entity velocities.
+            dt: time interval
+            radius: the radius shared by every entity.
+        Returns:
+            collision_types: an (...,) integer array, 1 for a bounce off the
+            left or right wall, 4 off the top or bottom and 5 off both.
+        """
+        collision_types = np.zeros(centers.shape[:-1], dtype=int)
+        for axis, size, code in ((0, self.boundary.WIDTH, 1), (1, self.boundary.HEIGHT, 4)):
+            span = size - 2 * radius
+            if span <= 0:
+                # there is no room to move along this axis
+                centers[..., axis] = size / 2
+                continue
+            # The path is unfolded onto a line of mirrored copies of the span,
+            # every wall crossed on the line is a bounce.
+            travelled = centers[..., axis] + velocities[..., axis] * dt - radius
+            walls = np.floor(travelled / span)
+            folded = travelled - walls * span
+            odd = walls % 2 == 1
+            centers[..., axis] = radius + np.where(odd, span - folded, folded)
+            velocities[..., axis][odd] *= -1
+            collision_types += code * (walls != 0)
+        return collision_types
@@ -0,0 +1,65 @@
+"""Settings of the dot tracking task. They are kept free of any GUI import
+so the offline tools can share them with the application.
+"""
+FACE_COLOR = 'white'
+RADIUS = 0.3
+CLICK_TOLERANCE = 0.0 # in data units outside of RADIUS which still hit a dot
+RELEASE_TOLERANCE = 0.0 # in data units outside of RADIUS, a release this close
+                        # to the pressed dot still selects it
+DT = 0.01 # fixed simulation step in s
+COLOR = 'black'
+SELECTION_COLOR = 'gray'
+BLINKING_COLOR = 'yellow'
+INCORRECT_COLOR = 'red'
+UNSELECTED_COLOR = 'green'
+START_FULLSCREEN = True
+RENDERER = 'matplotlib' # 'matplotlib' or 'qpainter', which paints the dots
+                        # straight into a Qt widget
+NUMBER_OF_DOTS = 10
+NUMBER_OF_TRACK_DOTS = 2
+VELOCITY = 3 # in data units / s
+BLINKING_DURATION = 2 * 1000 # in ms
+BLINK_PERIOD = 180 # in ms
+TRIAL_DURATION = 3 * 1000 # in ms
+INTERVAL = 30 # in ms
+FRAME_MARGIN = 5 # in ms, work deferred by a frame, e.g. label repaints and
+                 # logging, waits for a later frame this close to the next one
+DOT_COLLISIONS = False # whether dots bounce off each other
+SWEPT_COLLISIONS = False # whether dots bounce off the walls at the exact time
+                         # they touch them, which stays exact at any speed and DT
+# {name: {model: arguments}} of the models in motionmodels.MODELS, which change
+# the velocities in order on every simulation step
+MOTION_MODELS = {'constant': {},
+                 'random_walk': {'random_walk': {'turn_sd': 1.0}},
+                 'speed_jitter': {'speed_jitter': {'sd': 1.0}},
+                 'repulsion': {'interaction': {'strength': -10.0, 'distance': 2.0}},
+                 'attraction': {'interaction': {'strength': 10.0, 'distance': 2.0}},
+                 'crossing': {'crossing': {'rate': 0.5, 'contact': 2 * RADIUS}}}
+TRIAL_MOTION = {} # {trial: a name of MOTION_MODELS}, other trials are 'constant'
+# {constraint: arguments} of the constraints in constraints.CONSTRAINTS which
+# the whole trajectory of every trial meets, e.g.
+# {'minimum_separation': {'distance': 3 * RADIUS},
+#  'close_encounters': {'distance': 5 * RADIUS, 'maximum': 4},
+#  'wall_time': {'margin': 3 * RADIUS, 'fraction': 0.3}}
+TRAJECTORY_CONSTRAINTS = {}
+CANDIDATE_BATCH = 16 # the most candidate trajectories simulated at once
+MAX_CANDIDATES = 1024 # candidates tried before a trial fails like a placement
+TRAJECTORY_BUDGET = 2.0 # in s a trial may take to generate before it fails
+                        # like a placement, None for no limit
+SESSION_SEED = None # None draws a fresh seed for every session
+SESSION_DIRECTORY = 'sessions' # holds one directory per participant session
+OUTPUT_FILE = 'output_file.txt'
+RESULTS_FILE = 'results.txt' # lines of click,trial,time_s,x,y,dot,correct,rt_ms,rt_error_ms,latency_ms
+                             # and trial,trial,load,correct,duration_ms,error_ms
+                             # the errors are nan where the clock of the input
+                             # events is not the monotonic clock
+FRAME_TIMING_FILE = 'frame_timing.csv'
+RESULT_FLUSH_EVERY = 1 # number of result lines written between two flushes
+RESULT_FSYNC = True # whether every flush of the results reaches the disk
+TELEMETRY_ADDRESS = None # (host, port) on which the live progress, frame stats
+                         # and clicks are served as JSON, e.g. ('127.0.0.1', 8765)
+                         # for monitor.py, None serves nothing
+TRIAL_DICTIONARY = {0: 2, 1: 2, 2: 2, 3: 3, 4: 3,
+                    5: 3, 6: 3, 7: 3, 8: 4, 9: 4,
+                    10: 4, 11: 4, 12: 5, 13: 5, 14: 5, 15: 5} # Follows {trial: NUM_DOTS}
+
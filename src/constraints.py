@@ -0,0 +1,163 @@
+import numpy as np
+
+from placement import PlacementError
+
+# The number of tracked-other dot distances computed at once, which bounds
+# the memory of a check.
+CHUNK_SIZE = 1 << 20
+
+
+class ConstraintError(PlacementError):
+    """Raised when no candidate trajectory of a trial meets the constraints.
+    """
+
+
+class Constraint:
+    """A condition on the whole trajectory of a trial, checked on many
+    candidate trajectories at once. The tracked dots of a trial are the dots
+    0 to load - 1.
+    """
+    def check(self, positions, load, boundary):
+        """
+        Args:
+            positions: a (candidates, frames, dots, 2) array of dot centers.
+            load: the number of tracked dots.
+            boundary: an object with WIDTH and HEIGHT attributes.
+        Returns:
+            valid: a (candidates,) boolean array.
+        """
+        raise NotImplementedError
+
+
+class MinimumSeparation(Constraint):
+    """Keeps the centers of every tracked dot at least distance away from
+    every other dot on every frame.
+    """
+    def __init__(self, distance):
+        self.distance = distance
+
+    def check(self, positions, load, boundary):
+        closest = np.full(len(positions), np.inf)
+        for distances in tracked_distances(positions, load, self.distance):
+            np.minimum(closest, distances.min(axis=(1, 2, 3), initial=np.inf), out=closest)
+        return closest >= self.distance
+
+
+class CloseEncounters(Constraint):
+    """Caps the number of close encounters of a trial, the times a tracked
+    dot comes closer than distance to another dot. A pair which starts
+    closer counts as one encounter.
+    """
+    def __init__(self, distance, maximum):
+        """
+        Args:
+            distance: the distance between dot centers of an encounter.
+            maximum: the largest number of encounters of a valid trial.
+        """
+        self.distance = distance
+        self.maximum = maximum
+
+    def check(self, positions, load, boundary):
+        encounters = np.zeros(len(positions), dtype=int)
+        before = None
+        for distances in tracked_distances(positions, load, self.distance):
+            close = distances < self.distance
+            if before is None:
+                encounters += close[:, 0].sum(axis=(1, 2))
+            else:
+                encounters += (close[:, 0] & ~before).sum(axis=(1, 2))
+            encounters += (close[:, 1:] & ~close[:, :-1]).sum(axis=(1, 2, 3))
+            before = close[:, -1]
+        return encounters <= self.maximum
+
+
+class WallTime(Constraint):
+    """Bounds the share of the frames every tracked dot spends with its
+    center closer than margin to a wall.
+    """
+    def __init__(self, margin, fraction):
+        """
+        Args:
+            margin: the distance to a wall in data units.
+            fraction: the largest share of the frames near a wall.
+        """
+        self.margin = margin
+        self.fraction = fraction
+
+    def check(self, positions, load, boundary):
+        tracked = positions[:, :, :load]
+        near = ((tracked < self.margin)
+                | (tracked > np.array([boundary.WIDTH, boundary.HEIGHT]) - self.margin)).any(axis=-1)
+        return (near.mean(axis=1) <= self.fraction).all(axis=-1)
+
+
+def tracked_distances(positions, load, reach):
+    """Yields the distances of the tracked dots to the other dots in chunks
+    of consecutive frames. A pair of tracked dots is only in the row of the
+    first one. Two dots never get closer than their starting distance less
+    the largest displacement of each from its start, so the pairs which
+    stay reach apart by that bound are left out.
+    Args:
+        positions: a (candidates, frames, dots, 2) array of dot centers.
+        load: the number of tracked dots.
+        reach: the distance below which pairs matter.
+    Yields:
+        distances: a (candidates, chunk frames, load, neighbours) array of
+        the pairs kept, inf for padding.
+    """
+    candidates, frames, dots = positions.shape[:3]
+    chunk = max(1, CHUNK_SIZE // max(1, candidates * dots))
+    displacements = np.zeros((candidates, dots))
+    for first in range(0, frames, chunk):
+        moved = np.linalg.norm(positions[:, first:first + chunk] - positions[:, :1], axis=-1)
+        np.maximum(displacements, moved.max(axis=1), out=displacements)
+    start = positions[:, 0]
+    bounds = (np.linalg.norm(start[:, None, :, :] - start[:, :load, None, :], axis=-1)
+              - displacements[:, :load, None] - displacements[:, None, :])
+    # a tracked dot i is paired with the dots after it
+    kept = (bounds < reach) & (np.arange(dots) > np.arange(load)[:, None])
+    neighbours = kept.sum(axis=-1).max(initial=0)
+    order = np.argsort(~kept, axis=-1, kind='stable')[..., :neighbours]
+    padding = ~np.take_along_axis(kept, order, axis=-1)
+    others = order.reshape(candidates, 1, -1, 1)
+
+    chunk = max(1, CHUNK_SIZE // max(1, candidates * load * neighbours))
+    for first in range(0, frames, chunk):
+        window = positions[:, first:first + chunk]
+        offsets = (np.take_along_axis(window, others, axis=2).reshape(window.shape[:2] + order.shape[1:] + (2,))
+                   - window[:, :, :load, None, :])
+        distances = np.sqrt(np.einsum('...i,...i->...', offsets, offsets))
+        distances[np.broadcast_to(padding[:, None], distances.shape)] = np.inf
+        yield distances
+
+
+# Constraints by the name used in CONSTRAINTS.
+CONSTRAINTS = {'minimum_separation': MinimumSeparation,
+               'close_encounters': CloseEncounters,
+               'wall_time': WallTime}
+
+
+def make_constraints(constraints):
+    """Builds the constraints of a trial.
+    Args:
+        constraints: a dictionary of constraint names in CONSTRAINTS and
+        their keyword arguments.
+    Returns:
+        constraints: a list of Constraint objects.
+    """
+    return [CONSTRAINTS[name](**kwargs) for name, kwargs in constraints.items()]
+
+
+def validate(constraints, positions, load, boundary):
+    """Checks every constraint on a batch of candidate trajectories.
+    Returns:
+        valid: a (candidates,) boolean array.
+    """
+    valid = np.ones(len(positions), dtype=bool)
+    for constraint in constraints:
+        if not valid.any():
+            break
+        # only the candidates which passed so far are checked
+        remaining = np.flatnonzero(valid)
+        valid[remaining] = constraint.check(positions[remaining], load, boundary)
+    return valid
@@ -0,0 +1,108 @@
+import numpy as np
+
+
+def sweep_pairs(positions, distance):
+    """Finds the pairs of points less than distance apart along x by sweep
+    and prune.
+    Args:
+        positions: an (n, 2) array of points.
+        distance: the largest x distance of a pair.
+    Returns:
+        first, second: two index arrays of the pairs.
+    """
+    order = np.argsort(positions[:, 0], kind='stable')
+    xs = positions[order, 0]
+    first = []
+    second = []
+    shift = 1
+    # The k-th neighbour along x is only checked while some pair that far
+    # apart in the sorted order is still close along x.
+    while shift < len(xs):
+        close = xs[shift:] - xs[:-shift] < distance
+        if not close.any():
+            break
+        first.append(order[:-shift][close])
+        second.append(order[shift:][close])
+        shift += 1
+    if not first:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty
+    return np.concatenate(first), np.concatenate(second)
+
+
+class DotCollisionResolver:
+    """Elastic collisions between dots of equal mass and radius. Candidate
+    pairs are found by sweep and prune: the dots are sorted along x and
+    only dots whose x distance is below one diameter are compared.
+    """
+    def __init__(self, radius):
+        self.radius = radius
+
+    def candidate_pairs(self, positions):
+        """Broad phase of the collision detection.
+        Args:
+            positions: an (n, 2) array of dot centers.
+        Returns:
+            first, second: two index arrays of the pairs whose x intervals
+            overlap.
+        """
+        return sweep_pairs(positions, 2 * self.radius)
+
+    def detect_collisions(self, positions):
+        """Narrow phase of the collision detection.
+        Args:
+            positions: an (n, 2) array of dot centers.
+        Returns:
+            first, second: two index arrays of the overlapping pairs.
+        """
+        first, second = self.candidate_pairs(positions)
+        offsets = positions[second] - positions[first]
+        touching = np.einsum('ij,ij->i', offsets, offsets) < (2 * self.radius)**2
+        return first[touching], second[touching]
+
+    def resolve(self, positions, velocities):
+        """Bounces every pair of overlapping dots which are approaching each
+        other. The velocity components along the line of centers are swapped,
+        which is the elastic response for equal masses. A dot touching several
+        others is handled one pair per round so energy is conserved. Both
+        arrays are updated in place.
+        Args:
+            positions: an (n, 2) array of dot centers.
+            velocities: an (n, 2) array of dot velocities.
+        Returns:
+            colliding: an (n,) boolean array of the dots which bounced.
+        """
+        colliding = np.zeros(len(positions), dtype=bool)
+        first, second = self.detect_collisions(positions)
+        while len(first):
+            # Only pairs which do not share a dot with an earlier pair are
+            # resolved in this round.
+            pairs = np.arange(len(first))
+            owner = np.full(len(positions), len(first))
+            np.minimum.at(owner, first, pairs)
+            np.minimum.at(owner, second, pairs)
+            independent = (owner[first] == pairs) & (owner[second] == pairs)
+            self._bounce(positions, velocities, first[independent], second[independent], colliding)
+            first, second = first[~independent], second[~independent]
+        return colliding
+
+    def _bounce(self, positions, velocities, first, second, colliding):
+        """Elastic response for pairs of dots which share no dot.
+        """
+        offsets = positions[second] - positions[first]
+        distances = np.maximum(np.linalg.norm(offsets, axis=1), 1e-12)
+        normals = offsets / distances[:, None]
+        approach = np.einsum('ij,ij->i', velocities[first] - velocities[second], normals)
+        approaching = approach > 0
+        first, second = first[approaching], second[approaching]
+        normals = normals[approaching]
+        impulses = approach[approaching, None] * normals
+        velocities[first] -= impulses
+        velocities[second] += impulses
+        # Push the pair apart so it does not stay overlapped for the next
+        # step.
+        corrections = ((2 * self.radius - distances[approaching]) / 2)[:, None] * normals
+        positions[first] -= corrections
+        positions[second] += corrections
+        colliding[first] = True
+        colliding[second] = True
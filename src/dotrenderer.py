@@ -0,0 +1,196 @@
+import numpy as np
+
+# Color states of a dot, used as indices into the palette of a Renderer.
+NORMAL, BLINKING, SELECTED, INCORRECT, UNSELECTED = range(5)
+
+
+class PointerEvent:
+    """A mouse event in data units. It carries what the handlers of Window
+    read from a matplotlib MouseEvent, so every renderer can hand them the
+    same events.
+    """
+    def __init__(self, xdata, ydata, button=1, guiEvent=None):
+        """
+        Args:
+            xdata, ydata: the event location in data units.
+            button: 1, 2 or 3 for the left, middle or right button.
+            guiEvent: the Qt event behind the event or None.
+        """
+        self.xdata = xdata
+        self.ydata = ydata
+        self.button = button
+        self.guiEvent = guiEvent
+
+
+class Renderer:
+    """Shows the dots of a trial in a widget. The data units are inches with
+    the origin at the bottom left corner. The shown state of the dots is
+    kept in arrays indexed by dot, the positions and the color_codes, which
+    are color states. Subclasses draw them.
+    """
+    def __init__(self, radius):
+        """
+        Args:
+            radius: the radius of the dots in data units.
+        """
+        self.radius = radius
+        self.color_codes = np.zeros(0, dtype=np.uint8)
+
+    def size(self):
+        """Returns the width and height of the widget in data units.
+        """
+        raise NotImplementedError
+
+    def set_dpi(self, dpi):
+        """Sets the pixels per data unit used by size.
+        """
+        raise NotImplementedError
+
+    def fit(self, width, height):
+        """Shows the data area from (0, 0) to (width, height) in the widget
+        and redraws when it changes.
+        """
+        raise NotImplementedError
+
+    def connect(self, press, release, move):
+        """Hands the mouse events of the widget to the handlers. Every event
+        has xdata, ydata, button and guiEvent attributes.
+        """
+        raise NotImplementedError
+
+    def disconnect(self):
+        raise NotImplementedError
+
+    def set_dots(self, positions):
+        """Replaces the dots. Every dot starts in the NORMAL color state.
+        Args:
+            positions: an (n, 2) array of dot centers.
+        """
+        self.color_codes = np.full(len(positions), NORMAL, dtype=np.uint8)
+        self.set_positions(positions)
+        self._update_colors()
+
+    def set_positions(self, positions):
+        raise NotImplementedError
+
+    def set_colors(self, indices, state):
+        """Changes the color state of some dots.
+        Args:
+            indices: an index or a sequence of dot indices.
+            state: a color state or an array of them matching indices.
+        """
+        self.color_codes[indices] = state
+        self._update_colors()
+
+    def clear(self):
+        self.set_dots(np.empty((0, 2)))
+
+    def _update_colors(self):
+        pass
+
+    def draw(self):
+        """Redraws the whole widget.
+        """
+        raise NotImplementedError
+
+    def blit(self):
+        """Redraws the dots, the paint is done when this returns.
+        """
+        raise NotImplementedError
+
+
+class DotRenderer(Renderer):
+    """Draws every dot as one EllipseCollection on a matplotlib axis. The
+    static part of the figure is cached after every full draw so that the
+    dot layer can be blitted on its own.
+    """
+    def __init__(self, canvas, ax, radius, palette):
+        """
+        Args:
+            canvas: the matplotlib canvas holding ax.
+            ax: the axis the dots are drawn on.
+            radius: the radius of the dots in data units.
+            palette: a sequence of colors indexed by the color states.
+        """
+        # imported here so that the color states do not load matplotlib
+        from matplotlib.collections import EllipseCollection
+        from matplotlib.colors import to_rgba_array
+
+        super().__init__(radius)
+        self.canvas = canvas
+        self.widget = canvas
+        self.ax = ax
+        self.palette = to_rgba_array(palette)
+        self.background = None
+        self.cids = []
+        self.collection = EllipseCollection([], [], [], units='xy',
+                                            offsets=np.empty((0, 2)),
+                                            offset_transform=ax.transData,
+                                            linewidths=0, animated=True)
+        ax.add_collection(self.collection, autolim=False)
+        self.cid = canvas.mpl_connect('draw_event', self.on_draw)
+
+    def size(self):
+        return tuple(self.canvas.figure.get_size_inches())
+
+    def set_dpi(self, dpi):
+        figure = self.canvas.figure
+        figure.set_dpi(dpi)
+        figure.set_size_inches(self.canvas.width() * self.canvas.device_pixel_ratio / dpi,
+                               self.canvas.height() * self.canvas.device_pixel_ratio / dpi,
+                               forward=False)
+
+    def fit(self, width, height):
+        """Sets the axis limits. The canvas is only redrawn when they change
+        or no background is cached yet.
+        """
+        if (tuple(self.ax.get_xlim()) != (0, width)
+            or tuple(self.ax.get_ylim()) != (0, height)
+            or self.background is None):
+            self.ax.set_ylim([0, height])
+            self.ax.set_xlim([0, width])
+            self.canvas.draw()
+
+    def connect(self, press, release, move):
+        self.cids = [self.canvas.mpl_connect('button_release_event', release),
+                     self.canvas.mpl_connect('button_press_event', press),
+                     self.canvas.mpl_connect('motion_notify_event', move)]
+
+    def disconnect(self):
+        for cid in self.cids:
+            self.canvas.mpl_disconnect(cid)
+        self.cids = []
+
+    def set_dots(self, positions):
+        count = len(positions)
+        diameters = np.full(count, 2 * self.radius)
+        self.collection.set_widths(diameters)
+        self.collection.set_heights(diameters)
+        self.collection.set_angles(np.zeros(count))
+        super().set_dots(positions)
+
+    def set_positions(self, positions):
+        self.collection.set_offsets(positions)
+
+    def _update_colors(self):
+        self.collection.set_facecolors(self.palette[self.color_codes])
+
+    def on_draw(self, event):
+        """Caches the background after a full draw and paints the dots on
+        top of it, since the collection is excluded from full draws.
+        """
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.collection)
+
+    def draw(self):
+        self.canvas.draw()
+
+    def blit(self):
+        """Redraws only the dot layer over the cached background.
+        """
+        if self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.collection)
+        self.canvas.blit(self.ax.bbox)
@@ -0,0 +1,139 @@
+import bisect
+import collections
+import math
+import time
+
+from PyQt5.QtCore import Qt, QTimer
+
+
+class PhaseTimeline:
+    """The phases of a sub trial in order, every phase lasts a fixed time
+    from the first frame and the last one lasts until the next sub trial.
+    """
+    def __init__(self, phases):
+        """
+        Args:
+            phases: a list of (name, duration in ms) pairs, the duration of
+            the last phase is ignored.
+        """
+        self.names = [name for name, _ in phases]
+        self.starts = [0]
+        for _, duration in phases[:-1]:
+            self.starts.append(self.starts[-1] + duration)
+
+    def phase(self, elapsed):
+        """
+        Args:
+            elapsed: ms since the first frame of the sub trial
+        Returns:
+            phase: the name of the phase at elapsed.
+        """
+        return self.names[max(bisect.bisect_right(self.starts, elapsed) - 1, 0)]
+
+    def start(self, phase):
+        """Returns the start of a phase in ms since the first frame.
+        """
+        return self.starts[self.names.index(phase)]
+
+
+class FrameScheduler:
+    """Runs a frame callback on deadlines interval apart from the first
+    frame and on the given boundaries, e.g. the phase starts. A precise
+    single shot QTimer is set to the next deadline after every frame, so the
+    frames do not drift and no ticks queue up behind a slow frame. A tick
+    which comes after later deadlines have passed runs a single frame of the
+    current time, the deadlines it missed are counted as skipped. A frame
+    which runs past its interval is over budget. The tasks handed to defer
+    run after a frame within budget while at least margin is left before the
+    next deadline, and all at once when the scheduler stops.
+    """
+    def __init__(self, parent, interval, frame, margin=5):
+        """
+        Args:
+            parent: the QObject which owns the timer.
+            interval: the time between two deadlines in ms.
+            frame: the callable which runs one frame.
+            margin: the time in ms before the next deadline after which
+            deferred tasks wait for a later frame.
+        """
+        self.timer = QTimer(parent)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.tick)
+        self.interval = interval / 1000
+        self.frame = frame
+        self.margin = margin / 1000
+        self.deferred = collections.deque()
+        self.running = False
+        self.origin = None
+        self.boundaries = []
+        self.index = -1
+        self.skipped = 0
+        self.over_budget = 0
+
+    def start(self, boundaries=()):
+        """Runs the first frame right away and schedules the next ones.
+        Args:
+            boundaries: times in ms since the first frame at which a frame
+            is due besides the regular deadlines.
+        """
+        self.running = True
+        self.origin = time.perf_counter()
+        self.boundaries = sorted(boundary / 1000 for boundary in boundaries)
+        self.index = -1
+        self.skipped = 0
+        self.over_budget = 0
+        self.tick()
+
+    def stop(self):
+        """Stops the frames and runs every deferred task.
+        """
+        self.running = False
+        self.timer.stop()
+        self.run_deferred(float('inf'))
+
+    def defer(self, task):
+        """Runs the callable task once a frame has time to spare, or now if
+        the scheduler is stopped.
+        """
+        if self.running:
+            self.deferred.append(task)
+        else:
+            task()
+
+    def tick(self):
+        """Runs the frame due now and sets the timer to the next deadline.
+        """
+        if not self.running:
+            return
+        index = int((time.perf_counter() - self.origin) // self.interval)
+        self.skipped += max(index - self.index - 1, 0)
+        self.index = index
+        self.frame()
+        # the frame may have stopped the scheduler
+        if not self.running:
+            return
+        now = time.perf_counter()
+        deadline = self.origin + self.next_deadline(now - self.origin)
+        if now - self.origin >= (index + 1) * self.interval:
+            # the frame ran past its own interval
+            self.over_budget += 1
+        else:
+            self.run_deferred(deadline - self.margin)
+        self.timer.start(max(math.ceil((deadline - time.perf_counter()) * 1000), 0))
+
+    def next_deadline(self, elapsed):
+        """Returns the first deadline after elapsed in s since the first
+        frame.
+        """
+        deadline = (elapsed // self.interval + 1) * self.interval
+        i = bisect.bisect_right(self.boundaries, elapsed)
+        if i < len(self.boundaries):
+            deadline = min(deadline, self.boundaries[i])
+        return deadline
+
+    def run_deferred(self, until):
+        """Runs the deferred tasks in order until the perf_counter time until.
+        """
+        while self.deferred and time.perf_counter() < until:
+            self.deferred.popleft()()
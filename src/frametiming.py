@@ -0,0 +1,99 @@
+import time
+
+import numpy as np
+
+FIELDS = ['participant', 'trial', 'frames', 'mean_interval_ms', 'jitter_ms',
+          'max_interval_ms', 'late_frames', 'dropped_frames',
+          'blink_duration_ms', 'blink_error_ms', 'motion_duration_ms',
+          'motion_error_ms', 'first_frame_ms', 'skipped_frames',
+          'over_budget_frames']
+HEADER = ",".join(FIELDS)
+
+class FrameTimer:
+    """Records monotonic timestamps of the animation callbacks and of the
+    completed paints of one trial, and of the moments the trial phases
+    start.
+    """
+    def __init__(self, interval, late_factor=1.5):
+        """
+        Args:
+            interval: the expected time between two frames in ms.
+            late_factor: a paint is late once the time since the previous
+            paint exceeds late_factor * interval.
+        """
+        self.interval = interval
+        self.late_factor = late_factor
+        self.reset()
+
+    def reset(self, start=None):
+        """
+        Args:
+            start: the perf_counter time the trial was asked for, now if None.
+        """
+        self.start = time.perf_counter() if start is None else start
+        self.callbacks = []
+        self.paints = []
+        self.phases = {}
+
+    def callback(self):
+        self.callbacks.append(time.perf_counter())
+
+    def paint(self):
+        self.paints.append(time.perf_counter())
+
+    def mark(self, phase):
+        """Records the start of a phase, the last mark of a phase wins.
+        """
+        self.phases[phase] = time.perf_counter()
+
+    def phase_duration(self, start, end):
+        """Returns the time between two phase marks in ms or nan.
+        """
+        if start not in self.phases or end not in self.phases:
+            return float('nan')
+        return (self.phases[end] - self.phases[start]) * 1000
+
+    def stats(self, expected_blink, expected_motion, skipped=0, over_budget=0):
+        """Computes the frame pacing of the trial.
+        Args:
+            expected_blink: the expected duration of the blink phase in ms.
+            expected_motion: the expected duration of the motion phase in ms.
+            skipped: the number of frame deadlines skipped by the scheduler.
+            over_budget: the number of frames which ran past their interval.
+        Returns:
+            stats: a dictionary with the FIELDS which describe the timing.
+        """
+        intervals = np.diff(self.paints) * 1000
+        if len(intervals) == 0:
+            intervals = np.full(1, np.nan)
+        # A paint which took n intervals to arrive stands for n - 1 dropped
+        # frames.
+        dropped = np.maximum(np.round(intervals / self.interval) - 1, 0)
+        blink = self.phase_duration('blink', 'motion')
+        motion = self.phase_duration('motion', 'clicking')
+        return {'frames': len(self.paints),
+                'mean_interval_ms': np.mean(intervals),
+                'jitter_ms': np.std(intervals),
+                'max_interval_ms': np.max(intervals),
+                'late_frames': int(np.sum(intervals > self.late_factor * self.interval)),
+                'dropped_frames': int(np.nansum(dropped)),
+                'blink_duration_ms': blink,
+                'blink_error_ms': blink - expected_blink,
+                'motion_duration_ms': motion,
+                'motion_error_ms': motion - expected_motion,
+                'first_frame_ms': (self.paints[0] - self.start) * 1000 if self.paints else float('nan'),
+                'skipped_frames': skipped,
+                'over_budget_frames': over_budget}
+
+
+def format_frame_timing(participant, trial, stats):
+    """Formats the timing stats of one trial as a csv line matching HEADER.
+    """
+    row = dict(stats, participant=participant, trial=trial)
+    return ",".join(_format_field(row[field]) for field in FIELDS)
+
+
+def _format_field(value):
+    if isinstance(value, float):
+        return format(value, '.3f')
+    return str(value)
@@ -0,0 +1,84 @@
+import numpy as np
+
+class DotHitTester:
+    """Finds the dot under a point through a uniform grid over the dot
+    centers. The grid is rebuilt whenever it is queried with a new positions
+    array, which only happens once per frame at most.
+    """
+    def __init__(self, radius):
+        """
+        Args:
+            radius: the radius of the dots, also the size of the grid cells.
+        """
+        self.radius = radius
+        self.positions = None
+        self.origin = np.zeros(2)
+        self.shape = (0, 0)
+        self.sorted_keys = np.zeros(0, dtype=np.intp)
+        self.order = np.zeros(0, dtype=np.intp)
+
+    def rebuild(self, positions):
+        """Sorts the dots by the grid cell their center falls in.
+        Args:
+            positions: an (n, 2) array of dot centers.
+        """
+        self.positions = positions
+        if len(positions) == 0:
+            self.shape = (0, 0)
+            self.sorted_keys = np.zeros(0, dtype=np.intp)
+            self.order = np.zeros(0, dtype=np.intp)
+            return
+        self.origin = positions.min(axis=0)
+        cells = ((positions - self.origin) // self.radius).astype(np.intp)
+        self.shape = tuple(cells.max(axis=0) + 1)
+        keys = cells[:, 0] * self.shape[1] + cells[:, 1]
+        self.order = np.argsort(keys, kind='stable')
+        self.sorted_keys = keys[self.order]
+
+    def candidates(self, x, y, reach):
+        """Returns the indices of the dots in the cells within reach of the
+        point (x, y).
+        """
+        low = np.maximum(((np.array((x, y)) - reach - self.origin) // self.radius).astype(np.intp), 0)
+        high = np.minimum(((np.array((x, y)) + reach - self.origin) // self.radius).astype(np.intp),
+                          np.array(self.shape) - 1)
+        if np.any(high < low):
+            return self.order[:0]
+        # Every column of the covered cells is one contiguous key range.
+        columns = np.arange(low[0], high[0] + 1) * self.shape[1]
+        starts = np.searchsorted(self.sorted_keys, columns + low[1], side='left')
+        stops = np.searchsorted(self.sorted_keys, columns + high[1], side='right')
+        return np.concatenate([self.order[start:stop] for start, stop in zip(starts, stops)])
+
+    def nearest(self, positions, x, y, tolerance=0.0):
+        """Returns the dot closest to the point (x, y) among those which are
+        within radius + tolerance of it.
+        Args:
+            positions: an (n, 2) array of dot centers.
+            x, y: the point in data units.
+            tolerance: the distance in data units a point may be outside of
+            a dot and still hit it.
+        Returns:
+            index: the index of the dot or None
+        """
+        if positions is not self.positions:
+            self.rebuild(positions)
+        if x is None or y is None:
+            return None
+        reach = self.radius + tolerance
+        candidates = self.candidates(x, y, reach)
+        if len(candidates) == 0:
+            return None
+        distances = np.hypot(positions[candidates, 0] - x, positions[candidates, 1] - y)
+        closest = np.argmin(distances)
+        if distances[closest] < reach:
+            return int(candidates[closest])
+        return None
+
+    def contains(self, positions, index, x, y, tolerance=0.0):
+        """Checks whether the point (x, y) is within radius + tolerance of the
+        dot at index.
+        """
+        if x is None or y is None:
+            return False
+        return np.hypot(positions[index, 0] - x, positions[index, 1] - y) < self.radius + tolerance
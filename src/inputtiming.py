@@ -0,0 +1,50 @@
+import time
+
+# Event timestamps are in ms and wrap around at 32 bits on some platforms.
+WRAP = 2 ** 32
+
+
+class InputClock:
+    """Maps the timestamps of Qt input events onto time.perf_counter.
+    The window systems stamp input events in ms of the monotonic clock of
+    time.monotonic: CLOCK_MONOTONIC on Linux, the tick count on Windows and
+    the uptime on macOS. That clock is sampled when an event is handled, so
+    the age of the event is known without any assumption about how long its
+    dispatch took. Platforms which stamp events on another clock, like the
+    offscreen one or QTest, give ages beyond max_age, the error of their
+    events is unknown.
+    """
+    def __init__(self, max_age=10.0):
+        """
+        Args:
+            max_age: the oldest an event is expected to be when it is
+            handled in s, older events are taken to be stamped on another
+            clock.
+        """
+        self.resolution = max(time.get_clock_info('monotonic').resolution, 0.001)
+        self.max_age = max_age
+
+    def event_time(self, event):
+        """Estimates when an input event happened.
+        Args:
+            event: a matplotlib event, its guiEvent is the Qt event if any.
+        Returns:
+            time: the perf_counter time of the event in s.
+            error: a bound of the error of time in s, either way. It covers
+            the ms resolution of the timestamps, or the coarser one of the
+            monotonic clock, and the time taken to sample both clocks. It is
+            nan if the event is stamped on another clock, then time is the
+            handling of the event, which the event cannot be later than.
+            Events without a Qt event are synthesized and happen when they
+            are handled, with an error of 0.
+        """
+        start = time.perf_counter()
+        now = time.monotonic()
+        received = time.perf_counter()
+        timestamp = getattr(getattr(event, 'guiEvent', None), 'timestamp', None)
+        if timestamp is None:
+            return received, 0.0
+        age = ((int(now * 1000) - int(timestamp())) % WRAP) / 1000
+        if age > self.max_age:
+            return received, float('nan')
+        return received - age, self.resolution + received - start
@@ -1,64 +1,81 @@
+import time
+STARTED = time.perf_counter()
 import sys
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QDialog, QApplication, QPushButton, QVBoxLayout, \
                             QLineEdit, QHBoxLayout, QLabel, QMessageBox, \
-                            QFileDialog
+                            QWidget
 from PyQt5.QtGui import QFont
 import numpy as np
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-from matplotlib.patches import Circle
-import matplotlib.pyplot as plt
-import matplotlib as mpl
-import matplotlib.animation as animation
-
-from boundarycollision import BoundaryCollisionDetector
-from trackabledot import TrackableDot
-import random
-import time
 
-FACE_COLOR = 'white'
-RADIUS = 0.3
-DT = 0.05
-COLOR = 'black'
-SELECTION_COLOR = 'gray'
-BLINKING_COLOR = 'yellow'
-INCORRECT_COLOR = 'red'
-UNSELECTED_COLOR = 'green'
-START_FULLSCREEN = True
-NUMBER_OF_DOTS = 10
-NUMBER_OF_TRACK_DOTS = 2
-VELOCITY = 3 # in data units / s
-BLINKING_DURATION = 2 * 1000 # in ms
-TRIAL_DURATION = 3 * 1000 # in ms
-INTERVAL = 30 # in ms
-TRIAL_DICTIONARY = {0: 2, 1: 2, 2: 2, 3: 3, 4: 3,
-                    5: 3, 6: 3, 7: 3, 8: 4, 9: 4,
-                    10: 4, 11: 4, 12: 5, 13: 5, 14: 5, 15: 5} # Follows {trial: NUM_DOTS}
+from config import *
+from constraints import make_constraints
+from dotrenderer import DotRenderer, NORMAL, BLINKING, SELECTED, INCORRECT, \
+                        UNSELECTED
+from framescheduler import FrameScheduler, PhaseTimeline
+from frametiming import FrameTimer, HEADER as FRAME_TIMING_HEADER, format_frame_timing
+from hittest import DotHitTester
+from inputtiming import InputClock
+from placement import PlacementError
+from resultwriter import ResultWriter, ResultWriteError
+from recorder import SessionRecorder, PHASES, PRESS, RELEASE, NO_SELECTION, CORRECT, \
+                     INCORRECT as INCORRECT_OUTCOME
+from simclock import SimulationClock
+from telemetry import TelemetryBuffer, TelemetryServer, FRAME, CLICK, TRIAL_START, \
+                      TRIAL_END, SESSION_START, SESSION_END
+from trajectory import TrajectoryGenerator
+
+DOT_PALETTE = {NORMAL: COLOR, BLINKING: BLINKING_COLOR, SELECTED: SELECTION_COLOR,
+               INCORRECT: INCORRECT_COLOR, UNSELECTED: UNSELECTED_COLOR}
 
 
 class Window(QDialog):
+    # the number of windows built in this process
+    built = 0
+
     def __init__(self, parent=None):
         super(Window, self).__init__(parent)
-        # a figure instance to plot on
-        self.figure = Figure(facecolor=FACE_COLOR)
+        # the start up of the first window includes the imports, later
+        # windows of the process are timed from their construction
+        self.started = STARTED if Window.built == 0 else time.perf_counter()
+        Window.built += 1
+        # the renderer and its canvas are built by setup_canvas once the
+        # window is up, figure and ax are only set for the matplotlib one
+        self.figure = None
+        self.canvas = None
+        self.ax = None
+        self.renderer = None
+
+        # setup the gui
+        self.setup_ui()
 
         # This is to make the QDialog Window full size.
         if START_FULLSCREEN:
             self.showMaximized()
             self.setFixedSize(self.size())
 
-
-        self.canvas = FigureCanvas(self.figure)
-
-        # Steup the figures axis, margins, and background color.
-        self.setup_figure()
-
-        # setup the gui
-        self.setup_ui()
-
-        # initialize the dots list
-        self.dots = []
-        self.tracked_dots = {}
+        # initialize the trajectory of the trial, dots are referred to by
+        # their index in its arrays.
+        self.trajectory_generator = TrajectoryGenerator(self, NUMBER_OF_DOTS, RADIUS, VELOCITY, DT, DOT_COLLISIONS,
+                                                        SWEPT_COLLISIONS, make_constraints(TRAJECTORY_CONSTRAINTS),
+                                                        CANDIDATE_BATCH, MAX_CANDIDATES, TRAJECTORY_BUDGET)
+        self.trajectory = None
+        self.positions = np.empty((0, 2))
+        self.hit_tester = DotHitTester(RADIUS)
+        self.session_seed = None
+        self.pending_seed = None
+        # the trajectory of an upcoming trial is generated by a worker
+        self.trial_executor = ThreadPoolExecutor(max_workers=1)
+        self.prepared = None
+        # polls the worker while a requested trial is still being generated,
+        # so the gui thread never waits for it
+        self.prepare_timer = QTimer(self)
+        self.prepare_timer.setInterval(INTERVAL)
+        self.prepare_timer.timeout.connect(self.check_prepared)
+        self.preparing = None
+        self.tracked_dots = set()
         self.highlighted_dot = None
 
         # keep track of the trials
@@ -74,73 +91,185 @@ class Window(QDialog):
         self.total_duration = 0
         self.output_file = ""
         self.mouse_pressed = False
+        self.frame_timer = FrameTimer(INTERVAL)
+        self.input_clock = InputClock()
+        self.sim_clock = SimulationClock(DT)
+        self.phase = None
+        self.timeline = PhaseTimeline([('blink', BLINKING_DURATION),
+                                       ('motion', TRIAL_DURATION - BLINKING_DURATION),
+                                       ('clicking', None)])
+        self.subtrial_start = None
+        self.recorder = SessionRecorder(SESSION_DIRECTORY, 2 * int(TRIAL_DURATION / INTERVAL))
+        self.session_directory = None
+        self.result_writer = None
+        self.write_failed = False
+        self.startup_ms = float('nan')
+        # owned by the window, so its timer is stopped and deleted with it in
+        # the gui thread
+        self.frame_scheduler = FrameScheduler(self, INTERVAL, self.animate_frame, FRAME_MARGIN)
+        # written by the gui thread only, the server reads it from its own
+        # threads
+        self.telemetry = TelemetryBuffer()
+        self.telemetry_server = None
+        if TELEMETRY_ADDRESS is not None:
+            try:
+                self.telemetry_server = TelemetryServer(self.telemetry, TELEMETRY_ADDRESS, INTERVAL).start()
+            except OSError as error:
+                print("No telemetry is served: {}".format(error))
+
+        # build the canvas and the first trial once the event loop runs
+        QTimer.singleShot(0, self.warm_up)
+
+    def setup_canvas(self):
+        """Builds the RENDERER and its canvas in place of the placeholder.
+        The matplotlib imports take most of the start up time, so they are
+        deferred until the window is shown.
+        """
+        if self.canvas is not None:
+            return
+        if RENDERER == 'qpainter':
+            from painterrenderer import PainterRenderer
+
+            self.renderer = PainterRenderer(RADIUS, [DOT_PALETTE[state] for state in sorted(DOT_PALETTE)],
+                                            FACE_COLOR)
+            self.canvas = self.renderer.widget
+        elif RENDERER == 'matplotlib':
+            from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+            from matplotlib.figure import Figure
+
+            self.figure = Figure(facecolor=FACE_COLOR)
+            self.canvas = FigureCanvas(self.figure)
+            # Steup the figures axis, margins, and background color.
+            self.setup_figure()
+        else:
+            raise ValueError("Unknown RENDERER {!r}.".format(RENDERER))
+        self.main_layout.replaceWidget(self.canvas_placeholder, self.canvas)
+        self.canvas_placeholder.deleteLater()
+        self.canvas.show()
+        self.main_layout.activate()
+        self.renderer.connect(self.onclick, self.onrelease, self.onmouse)
+
+    def warm_up(self):
+        """Prepares the first trial while the participant types their ID.
+        Builds the canvas, fits the data area to it, which caches the
+        background of the matplotlib renderer, and generates the first trajectory of the next session.
+        """
+        if not self.track_button.isEnabled() or not self.isVisible():
+            return
+        self.setup_canvas()
+        self.fit_axes()
+        self.prepare_trial(self.next_session_seed(), 0)
+        if np.isnan(self.startup_ms):
+            self.startup_ms = (time.perf_counter() - self.started) * 1000
+            print("Ready {:.0f} ms after start up.".format(self.startup_ms))
+
+    def fit_axes(self):
+        """Fits the shown data area to the canvas size in inches.
+        """
+        self.grab_default_dimensions()
+        self.renderer.fit(self.WIDTH, self.HEIGHT)
+
+    def next_session_seed(self):
+        """Returns the seed of the next session, SESSION_SEED if it is set and
+        otherwise a seed drawn once until that session begins.
+        """
+        if SESSION_SEED is not None:
+            return SESSION_SEED
+        if self.pending_seed is None:
+            self.pending_seed = np.random.SeedSequence().entropy
+        return self.pending_seed
+
+    def prepare_trial(self, session_seed, trial_id):
+        """Starts generating the trajectory of a trial in the worker thread.
+        setup_dots uses it if the trial and the figure size still match.
+        """
+        if self.prepared is not None:
+            self.prepared[1].cancel()
+        key = (session_seed, trial_id, self.WIDTH, self.HEIGHT)
+        self.prepared = (key, self.trial_executor.submit(self.trajectory_generator.generate, session_seed,
+                                                         trial_id, self._motion_steps(),
+                                                         *self._trial_motion(trial_id)))
+
+    def trial_prepared(self):
+        """Returns whether the trajectory of the current trial is generated.
+        Starts generating it in the worker thread if no prefetch matches.
+        """
+        key = (self.session_seed, self.trial_id, self.WIDTH, self.HEIGHT)
+        if self.prepared is None or self.prepared[0] != key:
+            self.prepare_trial(self.session_seed, self.trial_id)
+        return self.prepared[1].done()
+
+    def wait_for_trial(self, requested):
+        """Shows that the requested trial is being prepared and starts it
+        once its trajectory is generated.
+        Args:
+            requested: the perf_counter time the trial was requested.
+        """
+        self.preparing = requested
+        self.next_button.setEnabled(False)
+        self.info_label.setText("Trial #{} -- Preparing ...".format(self.trial_id))
+        self.prepare_timer.start()
+
+    def check_prepared(self):
+        """Starts the trial waited for once its trajectory is generated.
+        """
+        if not self.trial_prepared():
+            return
+        self.prepare_timer.stop()
+        requested, self.preparing = self.preparing, None
+        self.next_button.setEnabled(True)
+        self.start_trial(requested)
 
     def setup_dots(self):
-        """Removes any dots on the canvas and generates a new list of them.
-        This method does not draw them or add them to the canvas.
+        """Takes the trajectory of the current trial from the prefetch, or
+        generates it from the session seed if none matches. The dots on the
+        canvas are only removed if the dots do not fit. This method does not
+        draw them. The gui thread only calls it once trial_prepared, so it
+        does not wait for the worker.
         """
-        self.remove_dots()
-        for i in range(NUMBER_OF_DOTS):
-            self.dots.append(TrackableDot((self.generate_location(self.dots, RADIUS)), RADIUS, COLOR, self.generate_velocity(VELOCITY), i))
+        key = (self.session_seed, self.trial_id, self.WIDTH, self.HEIGHT)
+        prepared, self.prepared = self.prepared, None
+        try:
+            if prepared is not None and prepared[0] == key:
+                trajectory = prepared[1].result()
+            else:
+                if prepared is not None:
+                    prepared[1].cancel()
+                trajectory = self.trajectory_generator.generate(self.session_seed, self.trial_id,
+                                                                self._motion_steps(),
+                                                                *self._trial_motion(self.trial_id))
+        except PlacementError:
+            self.remove_dots()
+            raise
+        self.trajectory = trajectory
+        self.positions = self.trajectory.positions[0]
 
     def draw_dots(self):
-        """Uses the dots list and adds the circles to the canvas and draws them.
-        This method does not create the circle objects.
+        """Hands the starting positions of the trajectory to the renderer
+        and draws them. This method does not generate the dots.
         """
-        for i in range(len(self.dots)):
-            self.ax.add_artist(self.dots[i])
-        self.canvas.draw()
+        self.renderer.set_dots(self.positions)
+        self.renderer.blit()
 
     def track_dots(self):
-        """Sets up a dictionary and in order to start the tracking.
-        Args:
-            num: an integer less than NUMBER_OF_DOTS, this determines the number
-            of tracked dots.
+        """Sets up the set of tracked dot indices in order to start the
+        tracking. The number of tracked dots is given by trial_clicks.
         """
-        self.tracked_dots = {}
-        for i in range(self.trial_clicks):
-            self.tracked_dots[self.dots[i].id] = (self.dots[i])
+        self.tracked_dots = set(range(self.trial_clicks))
 
     @property
     def valid_click(self):
         return self.trial_clicks > 0 and self.clicking_active
 
-    def generate_velocity(self, mag=1.0):
-        """Generate a velocity with magnitude of mag.
-        Returns:
-            vel: a velocity vector as a 2-tuple
-        """
-        vel = np.random.uniform(-1,1), np.random.uniform(-1,1)
-        normalization = np.sqrt(vel[0]**2 + vel[1]**2)
-        return vel[0]/normalization * mag, vel[1]/normalization * mag
-
-    def generate_location(self, dots_list, radius):
-        """Generates a location using the width and height of the window.
-        Args:
-            dots_list: a list of generated dots, used to prevent location collisions
-            radius: the size of the dots in the list
-        Returns:
-            a tuple which represents the location.
-        """
-        location = (np.random.uniform(0.1, 0.9) * self.WIDTH, np.random.uniform(0.1, 0.9) * self.HEIGHT)
-        should_restart = True
-        while should_restart:
-            should_restart = False
-            for dot in dots_list:
-                if (np.sqrt((location[0] - dot.center[0])**2 + (location[1] - dot.center[1])**2)) < (5 * radius):
-                    location = (np.random.uniform(0.1, 0.9) * self.WIDTH, np.random.uniform(0.1, 0.9) * self.HEIGHT)
-                    should_restart = True
-                    break
-        return location
-
     def grab_default_dimensions(self):
         """Stores default dimensions in order to allow resizing after tracking
         has ended.
         """
         self.DEFAULT_MINSIZE = self.minimumSize()
         self.DEFAULT_MAXSIZE = self.maximumSize()
-        self.WIDTH = self.figure.get_figwidth()
-        self.HEIGHT = self.figure.get_figheight()
+        if self.renderer is None:
+            return
+        self.WIDTH, self.HEIGHT = self.renderer.size()
 
     def reset_sizing(self):
         self.setMinimumSize(self.DEFAULT_MINSIZE)
@@ -199,37 +328,49 @@ class Window(QDialog):
         self.stop_message.setText("Are you sure you would like to stop tracking?")
         self.stop_message.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
 
+        # set up the message box shown when the dots do not fit
+        self.placement_message = QMessageBox()
+        self.placement_message.setIcon(QMessageBox.Critical)
+        self.placement_message.setStandardButtons(QMessageBox.Ok)
+
+        # set up the message box shown when the results are no longer written
+        self.write_message = QMessageBox()
+        self.write_message.setIcon(QMessageBox.Critical)
+        self.write_message.setStandardButtons(QMessageBox.Ok)
+
         self.save_message = QMessageBox()
         self.save_message.setIcon(QMessageBox.Information)
         self.save_message.setText("")
         # set the whole layout
-        layout = QVBoxLayout()
-        layout.addWidget(self.canvas)
-        layout.addLayout(self.bottom_layout)
-        self.setLayout(layout)
+        self.canvas_placeholder = QWidget()
+        self.main_layout = QVBoxLayout()
+        self.main_layout.addWidget(self.canvas_placeholder)
+        self.main_layout.addLayout(self.bottom_layout)
+        self.setLayout(self.main_layout)
 
     def remove_dots(self):
-        """Iterate through the dots array and delete them while removing them
-        from the canvas.
+        """Drops the trajectory and removes the dots from the canvas.
         """
-        for dot in self.dots:
-            dot.remove()
-        self.dots = []
-        self.canvas.draw()
+        self.trajectory = None
+        self.positions = np.empty((0, 2))
+        self.renderer.clear()
+        self.renderer.blit()
 
     def closeEvent(self, event):
         """This method is called when the application is closing.
         Disconnects the event handler which tracks the clicking.
         """
         print("The window will close.")
-        try:
-            self.figure.canvas.mpl_disconnect(self.cid)
-        except AttributeError:
-            pass
-        try:
-            self.line_ani._stop()
-        except AttributeError:
-            pass
+        if self.renderer is not None:
+            self.renderer.disconnect()
+        self.frame_scheduler.stop()
+        self.prepare_timer.stop()
+        self.trial_executor.shutdown(wait=False, cancel_futures=True)
+        self.recorder.close()
+        if self.result_writer is not None:
+            self.close_results()
+        if self.telemetry_server is not None:
+            self.telemetry_server.close()
         event.accept()
 
     def resizeEvent(self,event):
@@ -248,24 +389,56 @@ class Window(QDialog):
         begin.
         """
         if not self.clicking_active:
+            requested = time.perf_counter()
             if self.trial_id == 1:
                 self.total_duration = time.time()
-            self.update_info_label()
+            if self.trial_prepared():
+                self.start_trial(requested)
+            else:
+                self.wait_for_trial(requested)
+
+    def start_trial(self, requested):
+        """Shows the dots of the current trial and starts its animation.
+        Args:
+            requested: the perf_counter time the trial was requested.
+        """
+        try:
             self.setup_dots()
-            self.draw_dots()
-            self.canvas.draw()
-            self.track_dots()
-            self.animate_plot()
-            self.canvas.draw()
+        except PlacementError as error:
+            self.update_info_label()
+            self.placement_message.setText(str(error))
+            self.placement_message.exec_()
+            return
+        # the dots are shown by the first frame of the animation
+        self.renderer.set_dots(self.positions)
+        self.track_dots()
+        self.recorder.start_trial(self.trial_id, self.trajectory, self.tracked_dots)
+        self.telemetry.publish(TRIAL_START, self.trial_id, value=self.trial_clicks)
+        self.animate_plot(requested)
+        # repainted by the frames once they have time to spare
+        self.update_info_label()
 
     def begin_tracking_button_clicked(self):
         """Action when tracking button clicked.
         Validate the textField.text value and begin the animation sequence.
         """
-        self.grab_default_dimensions()
-        self.ax.set_ylim([0, self.HEIGHT])
-        self.ax.set_xlim([0, self.WIDTH])
+        self.setup_canvas()
+        self.fit_axes()
         if (self.has_valid_pid()):
+            self.session_seed = self.next_session_seed()
+            self.pending_seed = None
+            self.trial_id = 0
+            self.trial_clicks = self.trial_dictionary[self.trial_id]
+            self.trial_starts = []
+            self.trial_durations = []
+            self.correct_dots = np.sort(list(self.trial_dictionary.values()))
+            self.session_directory = self.recorder.start_session(self.text_field.text(), self.session_header())
+            if self.result_writer is not None:
+                self.close_results()
+            self.write_failed = False
+            self.result_writer = ResultWriter(self.session_directory, RESULT_FLUSH_EVERY, fsync=RESULT_FSYNC)
+            self.write_result(FRAME_TIMING_FILE, FRAME_TIMING_HEADER)
+            self.telemetry.publish(SESSION_START, self.trial_id)
             self.next_button.setEnabled(True)
             self.text_field.setReadOnly(True)
             self.track_button.setEnabled(False)
@@ -273,6 +446,29 @@ class Window(QDialog):
         else:
             self.display_pid_message()
 
+    def session_header(self):
+        """Returns the settings a recorded session needs to be replayed.
+        """
+        return {'seed': self.session_seed,
+                'width': self.WIDTH,
+                'height': self.HEIGHT,
+                'number_of_dots': NUMBER_OF_DOTS,
+                'radius': RADIUS,
+                'velocity': VELOCITY,
+                'dt': DT,
+                'interval': INTERVAL,
+                'blinking_duration': BLINKING_DURATION,
+                'trial_duration': TRIAL_DURATION,
+                'face_color': FACE_COLOR,
+                'palette': [DOT_PALETTE[state] for state in sorted(DOT_PALETTE)],
+                'trial_dictionary': self.trial_dictionary,
+                'motion_models': MOTION_MODELS,
+                'trial_motion': TRIAL_MOTION,
+                'swept_collisions': SWEPT_COLLISIONS,
+                'trajectory_constraints': TRAJECTORY_CONSTRAINTS,
+                'renderer': RENDERER,
+                'startup_ms': self.startup_ms}
+
     def stop_tracking_button_clicked(self, event):
         """Checks to see if tracking is currently active, if it is it stops
         the animation and allows the window to be resized.
@@ -280,14 +476,11 @@ class Window(QDialog):
         retval = self.stop_message.exec_()
         if retval == QMessageBox.Yes:
             self.text_field.setReadOnly(False)
-            self.canvas.draw()
+            self.renderer.draw()
             self.track_button.setEnabled(True)
             self.track_button.setText('Begin Tracking')
             self.remove_dots()
-            try:
-                self.dot_ani._stop()
-            except AttributeError:
-                pass
+            self.frame_scheduler.stop()
 
 
     def has_valid_pid(self):
@@ -300,77 +493,130 @@ class Window(QDialog):
         return False
 
 
-    def update_dots(self, i):
-        """Uses the velocity values of the dot and the detector class in order
-        to update the position of the dots.
-        Args:
-            i: generator for the animation
-        """
-        detector = BoundaryCollisionDetector(self)
-        for dot in self.dots:
-            dot.update_position(DT)
-            dot.colliding = detector.detect_collision(dot)
-        for dot in self.dots:
-            detector.update_velocity(dot)
-        return self.dots
-
-    def _blink_stage(self, i):
-        """Uses stored values to use one animation function to first blink
-        then move the dots.
-        Args:
-            i: the current iteration value
-        Returns:
-            blinking: a boolean which denotes if it is in the blinking stage.
+    def update_dots(self):
+        """Advances the simulation clock and shows the dots interpolated
+        between the two precomputed trajectory frames around the current
+        simulation time. No simulation happens here.
         """
-        num_iter = int(TRIAL_DURATION/INTERVAL)
-        if (i < int(num_iter / TRIAL_DURATION * BLINKING_DURATION)):
-            return True
+        self.sim_clock.advance()
+        last = len(self.trajectory) - 1
+        if self.sim_clock.steps >= last:
+            self.positions = self.trajectory.positions[last]
         else:
-            return False
+            before = self.trajectory.positions[self.sim_clock.steps]
+            after = self.trajectory.positions[self.sim_clock.steps + 1]
+            self.positions = before + (after - before) * self.sim_clock.alpha
+        self.renderer.set_positions(self.positions)
+
+    def _motion_steps(self):
+        """Returns the number of simulation steps of the motion stage.
+        """
+        return int(round((TRIAL_DURATION - BLINKING_DURATION) / 1000 / DT))
+
+    def _trial_motion(self, trial_id):
+        """Returns the motion models of a trial from TRIAL_MOTION and its
+        number of tracked dots.
+        """
+        return MOTION_MODELS[TRIAL_MOTION.get(trial_id, 'constant')], self.trial_dictionary[trial_id]
 
-    def conduct_subtrial(self, i):
-        """Runs the animation of a sub trial. Modifies a instance variable which
-        keeps track whether the trial is active.
+    def conduct_subtrial(self, elapsed):
+        """Runs the animation of a sub trial. Modifies instance variables
+        which keep track of the phase of the trial, the phase at elapsed is
+        taken from the timeline: the tracked dots first blink, then all dots
+        move, then clicking starts.
         Args:
-            sub_id: uses the TRIAL_DICTIONARY to determine the setup.
-            i: generator for the animation
+            elapsed: ms since the first frame of the sub trial
         """
-        if (self._blink_stage(i)):
-            if i == 0:
+        phase = self.timeline.phase(elapsed)
+        if self.phase == 'blink' and phase != 'blink':
+            self.renderer.set_colors(list(self.tracked_dots), NORMAL)
+        if phase == 'blink':
+            if self.phase is None:
                 #self.stop_button.setEnabled(False)
                 self.next_button.setEnabled(False)
                 self.dot_motion_active = True
-            if i % 6 == 0:
-                self.blink_dots(i)
-        elif (i + 1 == int(TRIAL_DURATION/INTERVAL)):
+            self.blink_dots(elapsed)
+        elif phase == 'motion':
+            if self.phase != 'motion':
+                self.sim_clock.start(self.subtrial_start + self.timeline.start('motion') / 1000)
+            self.update_dots()
+        else:
+            self.positions = self.trajectory.positions[-1]
+            self.renderer.set_positions(self.positions)
             self.dot_motion_active = False
             self.clicking_active = True
             self.next_button.setEnabled(False)
-            self.trial_starts.append(time.time())
-        else:
-            self.update_dots(i)
-
-    def animate_plot(self):
-        """Wrapper that runs the animation.
+            # the next trial is generated while the participant clicks
+            if self.trial_id + 1 in self.trial_dictionary:
+                self.prepare_trial(self.session_seed, self.trial_id + 1)
+        self.phase = phase
+
+    def animate_plot(self, requested=None):
+        """Wrapper that runs the animation. The frame scheduler runs the
+        first frame of the sub trial right away and then one on every
+        deadline and phase start, only the dot layer is blitted.
+        Args:
+            requested: the perf_counter time the trial was asked for, the
+            time to the first frame is measured from it.
         """
-        self.dot_ani = animation.FuncAnimation(self.figure, self.conduct_subtrial, int(TRIAL_DURATION/INTERVAL), interval=INTERVAL, repeat=False)
-
-    def blink_dots(self, i):
-        """Uses the dictionary of tracked dots and blinks them.
+        self.phase = None
+        self.subtrial_start = None
+        self.frame_timer.reset(requested)
+        self.frame_scheduler.start(self.timeline.starts[1:])
+
+    def animate_frame(self):
+        """Runs the current frame of the sub trial and blits the dots. The
+        sub trial is timed from the first frame. Recording the frame is
+        deferred until the scheduler has time to spare. The scheduler is
+        stopped once clicking starts and the frame timing of the trial is
+        written.
         """
-        for dot in self.tracked_dots.values():
-            if dot.color == BLINKING_COLOR:
-                dot.set_color(COLOR)
-                dot.color = COLOR
-            else:
-                dot.set_color(BLINKING_COLOR)
-                dot.color = BLINKING_COLOR
+        self.frame_timer.callback()
+        if self.subtrial_start is None:
+            self.subtrial_start = time.perf_counter()
+        previous_phase = self.phase
+        self.conduct_subtrial((time.perf_counter() - self.subtrial_start) * 1000)
+        self.renderer.blit()
+        self.frame_timer.paint()
+        paints = self.frame_timer.paints
+        self.telemetry.publish(FRAME, self.trial_id, PHASES[self.phase],
+                               value=(paints[-1] - paints[-2]) * 1000 if len(paints) > 1 else np.nan,
+                               extra=(paints[-1] - self.frame_timer.callbacks[-1]) * 1000)
+        self.frame_scheduler.defer(partial(self.recorder.record_frame,
+                                           self.frame_timer.paints[-1] - self.subtrial_start, self.phase,
+                                           self.positions, self.renderer.color_codes.copy()))
+        if self.phase != previous_phase:
+            self.frame_timer.mark(self.phase)
+        if self.phase == 'clicking':
+            # response times are measured from the paint of this frame
+            self.trial_starts.append(self.frame_timer.paints[-1])
+            self.frame_scheduler.stop()
+            self.write_frame_timing()
+
+    def write_frame_timing(self):
+        """Appends the frame pacing of the trial next to the output file.
+        """
+        stats = self.frame_timer.stats(BLINKING_DURATION, TRIAL_DURATION - BLINKING_DURATION,
+                                       self.frame_scheduler.skipped, self.frame_scheduler.over_budget)
+        self.write_result(FRAME_TIMING_FILE, format_frame_timing(self.text_field.text(), self.trial_id, stats))
+
+    def blink_dots(self, elapsed):
+        """Uses the set of tracked dots and blinks them. The dots switch
+        color every BLINK_PERIOD ms, starting in the blinking color on the
+        first frame.
+        Args:
+            elapsed: ms since the first frame of the sub trial
+        """
+        state = NORMAL if (elapsed // BLINK_PERIOD) % 2 else BLINKING
+        self.renderer.set_colors(list(self.tracked_dots), state)
 
 
     def setup_figure(self):
         '''Setup figure to eliminate the toolbar and resizing.
         Presents the figure.
         '''
+        import matplotlib as mpl
+
         # Remove toolbar
         mpl.rcParams['toolbar'] = 'None'
 
@@ -378,7 +624,7 @@ class Window(QDialog):
         self.figure.clear()
 
         self.ax = self.figure.add_subplot(111)
-
+        self.renderer = DotRenderer(self.canvas, self.ax, RADIUS, [DOT_PALETTE[state] for state in sorted(DOT_PALETTE)])
 
         # Remove ticks and labels on axis
         self.ax.set_xticks([])
@@ -390,25 +636,36 @@ class Window(QDialog):
         # Remove margin on plot.
         self.figure.subplots_adjust(left=0.0, bottom=0.0, right=1.0, top=1.00)
 
-        # refresh canvas
-        self.canvas.draw()
-        self.cid = self.figure.canvas.mpl_connect('button_release_event', self.onrelease)
-        self.cid = self.figure.canvas.mpl_connect('button_press_event', self.onclick)
-        self.cid = self.figure.canvas.mpl_connect('motion_notify_event', self.onmouse)
+    def write_result(self, name, line):
+        """Hands a line to the result writer, see report_write_error.
+        """
+        try:
+            self.result_writer.write(name, line)
+        except ResultWriteError as error:
+            self.report_write_error(error)
 
-    def _distance(self, loc1, loc2):
-        """Outputs distance between two tuples (x, y)
-        Args:
-            loc1/2: locations for distances to be computed
-        Returns:
-            dist: float value of distance
+    def close_results(self, wait=True):
+        """Closes the result writer, see report_write_error.
+        """
+        try:
+            self.result_writer.close(wait)
+        except ResultWriteError as error:
+            self.report_write_error(error)
+
+    def report_write_error(self, error):
+        """Tells the experimenter once per session that its results are no
+        longer written. The session goes on, so its recording is kept.
         """
-        return np.sqrt((loc1[0] - loc2[0])**2 + (loc1[1] - loc2[1])**2)
+        print(error)
+        if not self.write_failed:
+            self.write_failed = True
+            self.write_message.setText(str(error))
+            self.write_message.exec_()
 
     def update_info_label(self):
         new_string = "Trial #{} -- {} Clicks Left".format(self.trial_id, self.trial_clicks)
         self.info_label.setText(new_string)
-        self.info_label.repaint()
+        self.frame_scheduler.defer(self.info_label.repaint)
 
     def end_trial(self):
         """End the trial of 15 subtrials and reset the page. Also write output
@@ -425,26 +682,35 @@ class Window(QDialog):
         self.clicking_active = False
         trial_duration_string = [format(x * 1000, '.0f') for x in self.trial_durations]
         correct_dots_string = [str(x) for x in self.correct_dots]
-        with open('output_file.txt', 'w') as f:
-            f.write(self.text_field.text())
-            f.write('\n')
-            f.write(",".join(trial_duration_string))
-            f.write('\n')
-            f.write(",".join(correct_dots_string))
-
-    def dot_clicked(self):
+        self.write_result(OUTPUT_FILE, self.text_field.text())
+        self.write_result(OUTPUT_FILE, ",".join(trial_duration_string))
+        self.write_result(OUTPUT_FILE, ",".join(correct_dots_string))
+        self.write_result(OUTPUT_FILE, str(self.session_seed))
+        self.close_results(wait=False)
+        self.telemetry.publish(SESSION_END, self.trial_id)
+        QTimer.singleShot(0, self.warm_up)
+
+    def dot_clicked(self, event_time, error):
         """Updates the information label and the number of clicks left not in that
         order :)
+        Args:
+            event_time: the perf_counter time of the click.
+            error: the error bound of the response time in s.
         """
         self.trial_clicks -= 1
         self.update_info_label()
         if self.trial_clicks == 0:
-            self.trial_durations.append(time.time() - self.trial_starts[-1])
-            for dot in self.dots:
-                if (dot.id in self.tracked_dots and
-                    dot not in self.clicked_dots):
-                    dot.set_color(UNSELECTED_COLOR)
-                    self.canvas.draw()
+            self.trial_durations.append(event_time - self.trial_starts[-1])
+            self.write_result(RESULTS_FILE, "trial,{},{},{},{:.0f},{:.3f}".format(
+                self.trial_id, self.trial_dictionary[self.trial_id],
+                self.correct_dots[self.trial_id], self.trial_durations[-1] * 1000, error * 1000))
+            self.telemetry.publish(TRIAL_END, self.trial_id, value=self.trial_durations[-1] * 1000,
+                                   extra=self.correct_dots[self.trial_id])
+            unselected = [dot for dot in self.tracked_dots
+                          if dot not in self.clicked_dots]
+            self.renderer.set_colors(unselected, UNSELECTED)
+            self.renderer.blit()
+            self.recorder.finish_trial()
             if self.trial_id == 15:
                 self.trial_id = 0
                 self.end_trial()
@@ -457,37 +723,34 @@ class Window(QDialog):
                 #self.stop_button.setEnabled(True)
 
 
-    def detect_clicked_dot(self, dots_list, event):
-        """Uses an events location and returns a mpl.patches object corresponding
-        to the click.
+    def detect_clicked_dot(self, positions, event):
+        """Uses an events location and returns the index of the dot
+        corresponding to the click. The tolerance is CLICK_TOLERANCE in every
+        phase: clicks only select once clicking starts, when the dots no
+        longer move, so there is no motion to allow for.
         Args:
-            dots_list: A list of circle patch objects
+            positions: An (n, 2) array of dot centers
             event: The event which triggered the call (contains location)
         Returns:
-            circle: mpl.patches.Circle object which was clicked or None
-        """
-        circle = None
-        for dot in dots_list:
-            if self._distance(dot.center, (event.xdata, event.ydata)) < dot.radius:
-                if circle is not None:
-                    if self._distance(dot.center, (event.xdata, event.ydata)) < self._distance(circle.center, (event.xdata, event.ydata)):
-                        circle = dot
-                else:
-                    circle = dot
-        return circle
+            circle: index of the dot which was clicked or None
+        """
+        return self.hit_tester.nearest(positions, event.xdata, event.ydata, CLICK_TOLERANCE)
 
     def onclick(self, event):
         '''When a button is clicked, and while it is being held down it will be a
         different color.
         '''
         self.mouse_pressed = True
-        selected_dot = self.detect_clicked_dot(self.dots, event)
+        event_time, _ = self.input_clock.event_time(event)
+        selected_dot = self.detect_clicked_dot(self.positions, event)
+        self.recorder.record_event(self._trial_time(event_time), PRESS, event.xdata, event.ydata,
+                                   selected_dot, NO_SELECTION)
         if (selected_dot is not None and
             selected_dot not in self.clicked_dots
             and self.valid_click):
             self.highlighted_dot = selected_dot
-            selected_dot.set_color(SELECTION_COLOR)
-            self.canvas.draw()
+            self.renderer.set_colors(selected_dot, SELECTED)
+            self.renderer.blit()
 
 
 
@@ -496,39 +759,67 @@ class Window(QDialog):
         '''When the button is released, the selection is made if the release
         happens inside of a dot.
         '''
-
-        # TODO, use _distance to determine if highlighted_dot is also an option
-        # for clicked dot. if so then click that dot.
         self.mouse_pressed = False
-        if (event.xdata is not None):
-            selected_dot = self.detect_clicked_dot(self.dots, event)
-        else:
-            selected_dot = None
+        event_time, event_error = self.input_clock.event_time(event)
+        selected_dot = self.detect_clicked_dot(self.positions, event)
 
         if (self.highlighted_dot is not None and
-            self._distance(self.highlighted_dot.center,
-                                (event.xdata, event.ydata)) < 0.3):
+            self.hit_tester.contains(self.positions, self.highlighted_dot,
+                                     event.xdata, event.ydata, RELEASE_TOLERANCE)):
             selected_dot = self.highlighted_dot
         if (selected_dot is not None
             and selected_dot not in self.clicked_dots
             and self.valid_click):
-            if (selected_dot.id in self.tracked_dots):
+            if (selected_dot in self.tracked_dots):
                 self.clicked_dots.append(selected_dot)
-                selected_dot.set_color(BLINKING_COLOR)
-                self.canvas.draw()
+                self.renderer.set_colors(selected_dot, BLINKING)
+                self.renderer.blit()
+                outcome = CORRECT
             else:
                 self.clicked_dots.append(selected_dot)
-                selected_dot.set_color(INCORRECT_COLOR)
+                self.renderer.set_colors(selected_dot, INCORRECT)
                 self.correct_dots[self.trial_id] -= 1
-                self.canvas.draw()
-            self.dot_clicked()
-        elif (selected_dot is None
-              and self.highlighted_dot is not None
-              and self.highlighted_dot not in self.clicked_dots):
-            self.highlighted_dot.set_color(COLOR)
-            self.canvas.draw()
+                self.renderer.blit()
+                outcome = INCORRECT_OUTCOME
+            feedback_time = time.perf_counter()
+            release_time = self._trial_time(event_time)
+            # the clicking frame was shown up to a refresh after its paint
+            response_error = event_error + self._display_period()
+            self.recorder.record_event(release_time, RELEASE, event.xdata, event.ydata,
+                                       selected_dot, outcome)
+            self.write_result(RESULTS_FILE, "click,{},{:.6f},{:.4f},{:.4f},{},{},{:.3f},{:.3f},{:.3f}".format(
+                self.trial_id, release_time, event.xdata, event.ydata,
+                selected_dot, int(outcome == CORRECT),
+                (event_time - self.trial_starts[-1]) * 1000, response_error * 1000,
+                (feedback_time - event_time) * 1000))
+            self.telemetry.publish(CLICK, self.trial_id, dot=selected_dot,
+                                   value=(event_time - self.trial_starts[-1]) * 1000,
+                                   extra=outcome == CORRECT)
+            self.dot_clicked(event_time, response_error)
+        else:
+            if (selected_dot is None
+                and self.highlighted_dot is not None
+                and self.highlighted_dot not in self.clicked_dots):
+                self.renderer.set_colors(self.highlighted_dot, NORMAL)
+                self.renderer.blit()
+            self.recorder.record_event(self._trial_time(event_time), RELEASE, event.xdata, event.ydata,
+                                       selected_dot, NO_SELECTION)
         self.highlighted_dot = None
 
+    def _trial_time(self, t):
+        """Returns the time in s from the first frame of the sub trial to the
+        perf_counter time t.
+        """
+        if self.subtrial_start is None:
+            return float('nan')
+        return t - self.subtrial_start
+
+    def _display_period(self):
+        """Returns the refresh period of the screen in s, a painted frame is
+        shown within it.
+        """
+        return 1 / QApplication.primaryScreen().refreshRate()
+
     def onmouse(self, event):
         '''If the mouse moves while the user has the cursor pressed the selection should be
         undone and the color should change back.
@@ -538,10 +829,10 @@ class Window(QDialog):
         #         # check to see if dot is still selected
         #         # if not reset the instance variable
         #         # if so do nothing.
-        #         if (self.highlighted_dot == self.detect_clicked_dot(self.dots, event)):
+        #         if (self.highlighted_dot == self.detect_clicked_dot(self.positions, event)):
         #             pass
         #         else:
-        #             self.highlighted_dot.set_color(COLOR)
+        #             self.renderer.set_colors(self.highlighted_dot, NORMAL)
         #             self.highlighted_dot = None
         #
 
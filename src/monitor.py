@@ -0,0 +1,88 @@
+"""Watches the live telemetry of several stations from one console.
+
+    python monitor.py HOST:PORT [HOST:PORT ...] [--period 1.0] [--once]
+
+Every station serves its telemetry when TELEMETRY_ADDRESS is set. The
+/status of every station is polled in parallel and printed as one line per
+station: the trial, its phase and clicks, the trials done, the pacing of
+the last frames and the last click. A station which does not answer within
+the timeout is shown as offline.
+"""
+import argparse
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+COLUMNS = ['station', 'state', 'trial', 'phase', 'clicks', 'done', 'interval_ms',
+           'jitter_ms', 'late', 'work_ms', 'last_click']
+
+
+def fetch_status(station, timeout):
+    """Returns the /status of a station or None if it does not answer.
+    """
+    try:
+        with urllib.request.urlopen('http://{}/status'.format(station), timeout=timeout) as response:
+            return json.load(response)
+    except (OSError, ValueError):
+        return None
+
+
+def format_status(station, status):
+    """Returns the COLUMNS of a station as strings.
+    """
+    if status is None:
+        return [station, 'offline'] + [''] * (len(COLUMNS) - 2)
+    frames = status['frames']
+    click = status['last_click']
+    return [station,
+            status['state'],
+            _text(status['trial']),
+            _text(status['phase']),
+            '{}/{}'.format(status['clicks'], _text(status['load'])),
+            str(status['trials_done']),
+            _number(frames.get('mean_interval_ms')),
+            _number(frames.get('jitter_ms')),
+            _text(frames.get('late_frames')),
+            _number(frames.get('mean_work_ms')),
+            '' if click is None else '{} {} {:.0f} ms'.format(
+                click['dot'], 'correct' if click['correct'] else 'wrong', click['rt_ms'])]
+
+
+def format_table(rows):
+    widths = [max(len(row[i]) for row in rows) for i in range(len(COLUMNS))]
+    return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+                     for row in rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('stations', nargs='+', help='the HOST:PORT of every station')
+    parser.add_argument('--period', type=float, default=1.0, help='the time in s between two polls')
+    parser.add_argument('--timeout', type=float, default=0.5, help='the longest wait in s for a station')
+    parser.add_argument('--once', action='store_true', help='polls once and exits')
+    args = parser.parse_args(argv)
+
+    with ThreadPoolExecutor(max_workers=len(args.stations)) as executor:
+        while True:
+            start = time.monotonic()
+            statuses = executor.map(fetch_status, args.stations, [args.timeout] * len(args.stations))
+            rows = [COLUMNS] + [format_status(station, status)
+                                for station, status in zip(args.stations, statuses)]
+            print(format_table(rows), flush=True)
+            if args.once:
+                return
+            print()
+            time.sleep(max(args.period - (time.monotonic() - start), 0))
+
+
+def _text(value):
+    return '' if value is None else str(value)
+
+
+def _number(value):
+    return '' if value is None else format(value, '.1f')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import numpy as np
+
+from boundarycollision import BoundaryCollisionDetector
+from dotcollision import DotCollisionResolver
+
+class MotionEngine:
+    """Keeps the state of every dot in contiguous arrays and advances all of
+    them in one batched step. Row i of every array belongs to dot i. Without
+    dot collisions the arrays may have leading dimensions, e.g. to advance
+    many independent trials at once.
+    """
+    def __init__(self, boundary, radius, dot_collisions=False, models=(), swept_collisions=False):
+        """
+        Args:
+            boundary: an object with WIDTH and HEIGHT attributes.
+            radius: the radius of the dots.
+            dot_collisions: whether the dots bounce off each other.
+            models: the MotionModel objects which change the velocities
+            before every step, in order.
+            swept_collisions: whether the dots bounce off the boundary at
+            the exact time they touch it rather than after a step in which
+            they overlap it.
+        """
+        self.detector = BoundaryCollisionDetector(boundary)
+        self.resolver = DotCollisionResolver(radius) if dot_collisions else None
+        self.radius = radius
+        self.models = list(models)
+        self.swept_collisions = swept_collisions
+        self.positions = np.empty((0, 2))
+        self.velocities = np.empty((0, 2))
+        self.colliding = np.zeros(0, dtype=int)
+        self.dot_colliding = np.zeros(0, dtype=bool)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def reset(self, positions, velocities, load=0, rng=None):
+        """Replaces the state of the engine and starts the models on it.
+        Args:
+            positions: an (..., n, 2) array like of dot centers.
+            velocities: an (..., n, 2) array like of dot velocities.
+            load: the number of tracked dots, which are the first dots.
+            rng: the numpy Generator the models draw from, a fresh one if
+            None.
+        Raises:
+            ValueError: for leading dimensions with dot collisions.
+        """
+        positions = np.array(positions, dtype=float)
+        if positions.ndim < 2:
+            positions = positions.reshape(-1, 2)
+        if positions.ndim > 2 and self.resolver is not None:
+            raise ValueError("Dot collisions need a single (n, 2) array of positions.")
+        self.positions = positions
+        self.velocities = np.array(velocities, dtype=float).reshape(self.positions.shape)
+        self.colliding = np.zeros(self.positions.shape[:-1], dtype=int)
+        self.dot_colliding = np.zeros(self.positions.shape[:-1], dtype=bool)
+        if self.models and rng is None:
+            rng = np.random.default_rng()
+        for model in self.models:
+            model.start(self.positions, self.velocities, load, rng)
+
+    def step(self, dt):
+        """Lets the models change the velocities, moves every dot by its
+        velocity and bounces the dots which touch each other, if enabled, and
+        the boundary.
+        Args:
+            dt: time interval
+        """
+        for model in self.models:
+            model.step(self.positions, self.velocities, dt)
+        if self.swept_collisions:
+            self.colliding = self.detector.sweep(self.positions, self.velocities, dt, self.radius)
+        else:
+            self.positions += self.velocities * dt
+        if self.resolver is not None:
+            self.dot_colliding = self.resolver.resolve(self.positions, self.velocities)
+            if self.swept_collisions:
+                # separating two dots may push one of them into a wall
+                boundary = self.detector.boundary
+                np.clip(self.positions, self.radius,
+                        np.array([boundary.WIDTH, boundary.HEIGHT]) - self.radius, out=self.positions)
+        if not self.swept_collisions:
+            self.colliding = self.detector.detect_collisions(self.positions, self.radius)
+            self.detector.reflect_velocities(self.velocities, self.colliding)
@@ -0,0 +1,216 @@
+import numpy as np
+
+from dotcollision import sweep_pairs
+
+# The most dots per trial for which Interaction compares every pair of many
+# trials at once rather than sweeping every trial.
+DENSE_DOTS = 64
+
+
+class MotionModel:
+    """Changes the velocities of the dots of a MotionEngine before every
+    step. Every model works on the whole arrays of the engine at once, which
+    may have leading dimensions of independent trials. The tracked dots of a
+    trial are the dots 0 to load - 1.
+    """
+    def start(self, positions, velocities, load, rng):
+        """Called once the engine holds the starting state of a trial.
+        Args:
+            positions: an (..., n, 2) array of dot centers.
+            velocities: an (..., n, 2) array of dot velocities.
+            load: the number of tracked dots.
+            rng: the numpy Generator to draw from.
+        """
+        self.load = load
+        self.rng = rng
+
+    def step(self, positions, velocities, dt):
+        """Updates the velocities in place before the dots move.
+        Args:
+            positions: an (..., n, 2) array of dot centers.
+            velocities: an (..., n, 2) array of dot velocities.
+            dt: time interval
+        """
+        raise NotImplementedError
+
+
+class RandomWalk(MotionModel):
+    """Turns every dot by a random angle on every step, so the directions of
+    the dots diffuse while their speeds are kept.
+    """
+    def __init__(self, turn_sd=1.0):
+        """
+        Args:
+            turn_sd: the standard deviation of the heading change over one
+            second in radians.
+        """
+        self.turn_sd = turn_sd
+
+    def step(self, positions, velocities, dt):
+        angles = self.rng.normal(0, self.turn_sd * np.sqrt(dt), velocities.shape[:-1])
+        _rotate(velocities, np.cos(angles), np.sin(angles))
+
+
+class SpeedJitter(MotionModel):
+    """Lets the speed of every dot wander around its starting speed as an
+    Ornstein-Uhlenbeck process. The directions are kept.
+    """
+    def __init__(self, sd=1.0, reversion=2.0, minimum=0.1):
+        """
+        Args:
+            sd: the standard deviation of the speeds around the starting
+            speed in data units / s.
+            reversion: the rate in 1 / s at which a speed returns to the
+            starting speed.
+            minimum: the lowest speed as a fraction of the starting speed.
+        """
+        self.sd = sd
+        self.reversion = reversion
+        self.minimum = minimum
+
+    def start(self, positions, velocities, load, rng):
+        super().start(positions, velocities, load, rng)
+        self.nominal = np.linalg.norm(velocities, axis=-1)
+        self.speeds = self.nominal.copy()
+
+    def step(self, positions, velocities, dt):
+        noise = self.rng.normal(0, self.sd * np.sqrt(2 * self.reversion * dt), self.speeds.shape)
+        self.speeds += self.reversion * (self.nominal - self.speeds) * dt + noise
+        np.maximum(self.speeds, self.minimum * self.nominal, out=self.speeds)
+        _set_speeds(velocities, self.speeds)
+
+
+class Interaction(MotionModel):
+    """Attracts or repels the dots closer than distance to each other. The
+    pull grows linearly as two dots get closer and turns the dots without
+    changing their speeds.
+    """
+    def __init__(self, strength=-10.0, distance=2.0):
+        """
+        Args:
+            strength: the acceleration in data units / s^2 between two dots
+            at the same place, attraction if positive and repulsion if
+            negative.
+            distance: the range of the interaction in data units.
+        """
+        self.strength = strength
+        self.distance = distance
+
+    def step(self, positions, velocities, dt):
+        speeds = np.linalg.norm(velocities, axis=-1)
+        velocities += self.accelerations(positions) * dt
+        _set_speeds(velocities, speeds)
+
+    def accelerations(self, positions):
+        """Returns the (..., n, 2) accelerations of the dots. A single trial
+        only compares the pairs found by sweep and prune, many trials of up
+        to DENSE_DOTS dots compare every pair.
+        """
+        if positions.ndim > 2 and positions.shape[-2] > DENSE_DOTS:
+            accelerations = [self.accelerations(trial) for trial in positions.reshape(-1, *positions.shape[-2:])]
+            return np.reshape(accelerations, positions.shape)
+        if positions.ndim > 2:
+            offsets = positions[..., None, :, :] - positions[..., :, None, :]
+            distances = np.linalg.norm(offsets, axis=-1)
+            weights = np.clip(1 - distances / self.distance, 0, None)
+            # a dot does not pull itself, its own weight is 1 but its offset 0
+            pulls = offsets * (weights / np.maximum(distances, 1e-12))[..., None]
+            return self.strength * pulls.sum(axis=-2)
+        first, second = sweep_pairs(positions, self.distance)
+        offsets = positions[second] - positions[first]
+        distances = np.linalg.norm(offsets, axis=1)
+        near = distances < self.distance
+        first, second = first[near], second[near]
+        pulls = offsets[near] * ((1 - distances[near] / self.distance)
+                                 / np.maximum(distances[near], 1e-12))[:, None]
+        accelerations = np.empty(positions.shape)
+        for axis in range(2):
+            accelerations[:, axis] = (np.bincount(first, pulls[:, axis], len(positions))
+                                      - np.bincount(second, pulls[:, axis], len(positions)))
+        return self.strength * accelerations
+
+
+class Crossing(MotionModel):
+    """Forces crossing events: a tracked dot and the untracked dot nearest
+    to it head for each other until they are contact apart, after which they
+    keep going and pass each other. Every tracked dot not in a crossing
+    starts one at the given rate, with any untracked dot but the one it
+    crossed last. It should be the last model so that nothing turns the
+    dots of a crossing.
+    """
+    def __init__(self, rate=0.5, contact=0.6):
+        """
+        Args:
+            rate: the number of crossings started per tracked dot and second.
+            contact: the distance in data units which ends a crossing.
+        """
+        self.rate = rate
+        self.contact = contact
+
+    def start(self, positions, velocities, load, rng):
+        super().start(positions, velocities, load, rng)
+        self.partners = np.full(positions.shape[:-2] + (load,), -1)
+        self.previous = np.full(positions.shape[:-2] + (load,), -1)
+
+    def step(self, positions, velocities, dt):
+        load = self.load
+        if load == 0 or load == positions.shape[-2]:
+            return
+        tracked = positions[..., :load, :]
+        offsets = positions[..., None, load:, :] - tracked[..., :, None, :]
+        distances = np.linalg.norm(offsets, axis=-1)
+        distances[np.arange(load, positions.shape[-2]) == self.previous[..., None]] = np.inf
+        starting = (self.partners < 0) & (self.rng.random(self.partners.shape) < self.rate * dt)
+        self.partners[starting] = load + np.argmin(distances, axis=-1)[starting]
+        active = self.partners >= 0
+        if not active.any():
+            return
+        partners = np.maximum(self.partners, 0)
+        # the offsets from every tracked dot to its partner
+        offsets = np.take_along_axis(positions, partners[..., None], axis=-2) - tracked
+        distances = np.linalg.norm(offsets, axis=-1)
+        ended = active & (distances <= self.contact)
+        self.previous[ended] = self.partners[ended]
+        self.partners[ended] = -1
+        heading = active & (distances > self.contact)
+        directions = offsets / np.maximum(distances, 1e-12)[..., None]
+        speeds = np.linalg.norm(velocities, axis=-1)
+        partner_speeds = np.take_along_axis(speeds, partners, axis=-1)
+        tracked_velocities = velocities[..., :load, :]
+        tracked_velocities[heading] = (directions * speeds[..., :load, None])[heading]
+        partner_velocities = -directions * partner_speeds[..., None]
+        batch = np.nonzero(heading)
+        velocities[batch[:-1] + (partners[heading],)] = partner_velocities[heading]
+
+
+# Motion models by the name used in MOTION_MODELS.
+MODELS = {'random_walk': RandomWalk,
+          'speed_jitter': SpeedJitter,
+          'interaction': Interaction,
+          'crossing': Crossing}
+
+
+def make_models(motion):
+    """Builds the models of a motion.
+    Args:
+        motion: a dictionary of model names in MODELS and their keyword
+        arguments, the models run in its order.
+    Returns:
+        models: a list of MotionModel objects.
+    """
+    return [MODELS[name](**kwargs) for name, kwargs in motion.items()]
+
+
+def _rotate(velocities, cos, sin):
+    x = velocities[..., 0].copy()
+    velocities[..., 0] = cos * x - sin * velocities[..., 1]
+    velocities[..., 1] = sin * x + cos * velocities[..., 1]
+
+
+def _set_speeds(velocities, speeds):
+    """Scales the velocities in place to the speeds, velocities of zero are
+    left unchanged.
+    """
+    norms = np.linalg.norm(velocities, axis=-1)
+    scale = np.divide(speeds, norms, out=np.ones_like(norms), where=norms > 0)
+    velocities *= scale[..., None]
@@ -0,0 +1,90 @@
+import numpy as np
+
+
+class Observer:
+    """A model observer of the tracking task. It runs on many trials at
+    once: it is shown the targets, then sees the dots on every displayed
+    frame, and finally picks the dots it believes are the targets.
+    """
+    def start(self, positions, targets, rng):
+        """Shows the blinking targets.
+        Args:
+            positions: a (trials, dots, 2) array of dot centers.
+            targets: a (trials, load) array of the target indices.
+            rng: the numpy Generator to draw from.
+        """
+        raise NotImplementedError
+
+    def observe(self, positions, rng):
+        """Shows a displayed frame of the motion phase.
+        Args:
+            positions: a (trials, dots, 2) array of dot centers.
+            rng: the numpy Generator to draw from.
+        """
+        raise NotImplementedError
+
+    def respond(self, rng):
+        """Returns a (trials, load) array of the picked dot indices. A dot
+        may be picked more than once, the repeats are filled with guesses.
+        """
+        raise NotImplementedError
+
+
+class NearestNeighborObserver(Observer):
+    """Follows every target by jumping to the dot nearest to where it saw
+    the target last. Every dot position is perceived with gaussian noise.
+    """
+    def __init__(self, noise=0.1):
+        """
+        Args:
+            noise: the standard deviation of the perceived positions in data
+            units.
+        """
+        self.noise = noise
+
+    def _perceive(self, positions, rng):
+        if self.noise == 0:
+            return positions
+        return positions + rng.normal(0, self.noise, positions.shape)
+
+    def start(self, positions, targets, rng):
+        self.picked = np.array(targets)
+        perceived = self._perceive(positions, rng)
+        self.estimates = np.take_along_axis(perceived, self.picked[..., None], axis=1)
+
+    def observe(self, positions, rng):
+        perceived = self._perceive(positions, rng)
+        distances = np.linalg.norm(self.estimates[:, :, None] - perceived[:, None], axis=-1)
+        self.picked = np.argmin(distances, axis=2)
+        self.estimates = np.take_along_axis(perceived, self.picked[..., None], axis=1)
+
+    def respond(self, rng):
+        return self.picked
+
+
+# Observers by the name used on the command line of simulate.py.
+OBSERVERS = {'nearest': NearestNeighborObserver}
+
+
+def score(picked, load, number_of_dots, rng):
+    """Counts the targets among the picked dots of every trial. A dot picked
+    more than once leaves clicks, which go to dots drawn at random among the
+    dots not picked, like a participant guessing the rest.
+    Args:
+        picked: a (trials, load) array of picked dot indices.
+        load: the number of targets, which are the dots 0 to load - 1.
+        number_of_dots: the number of dots of a trial.
+        rng: the numpy Generator to draw from.
+    Returns:
+        correct: a (trials,) array of the number of correct clicks.
+    """
+    trials = len(picked)
+    chosen = np.zeros((trials, number_of_dots), dtype=bool)
+    chosen[np.arange(trials)[:, None], picked] = True
+    found = chosen[:, :load].sum(axis=1)
+    distinct = chosen.sum(axis=1)
+    # The guesses are drawn without replacement, so the number of targets
+    # among them is hypergeometric.
+    guessed = rng.hypergeometric(load - found, number_of_dots - distinct - (load - found),
+                                 load - distinct)
+    return found + guessed
@@ -0,0 +1,162 @@
+import numpy as np
+from PyQt5.QtCore import QPointF, QRectF, Qt
+from PyQt5.QtGui import QColor, QImage, QPainter, QPixmap
+from PyQt5.QtWidgets import QWidget
+
+from dotrenderer import Renderer, PointerEvent
+
+# The default dpi of a matplotlib figure, so that both renderers have the
+# same data units.
+DPI = 100
+
+# Matplotlib numbers of the mouse buttons.
+BUTTONS = {Qt.LeftButton: 1, Qt.MiddleButton: 2, Qt.RightButton: 3}
+
+
+class DotCanvas(QWidget):
+    """The widget a PainterRenderer paints into. Its mouse events are handed
+    to the renderer.
+    """
+    def __init__(self, renderer):
+        super(DotCanvas, self).__init__()
+        self.renderer = renderer
+        # the whole widget is filled on every paint
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self.setMouseTracking(True)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        self.renderer.paint(painter)
+        painter.end()
+
+    def mousePressEvent(self, event):
+        self.renderer.dispatch('press', event)
+
+    def mouseReleaseEvent(self, event):
+        self.renderer.dispatch('release', event)
+
+    def mouseMoveEvent(self, event):
+        self.renderer.dispatch('move', event)
+
+
+class PainterRenderer(Renderer):
+    """Paints the dots straight into a Qt widget with QPainter. Every color
+    state has a prerendered sprite of a dot, so a paint fills the face color
+    and copies one sprite per dot.
+    """
+    def __init__(self, radius, palette, face_color, dpi=DPI):
+        """
+        Args:
+            radius: the radius of the dots in data units.
+            palette: a sequence of Qt color names indexed by the color states.
+            face_color: the Qt color name of the background.
+            dpi: the pixels per data unit used by size.
+        """
+        super().__init__(radius)
+        self.palette = [_color(color) for color in palette]
+        self.face_color = _color(face_color)
+        self.dpi = dpi
+        self.extent = (1.0, 1.0)
+        self.positions = np.empty((0, 2))
+        self.handlers = {}
+        self.sprites = []
+        self.sprite_scale = None
+        self.widget = DotCanvas(self)
+
+    def size(self):
+        ratio = self.widget.devicePixelRatioF()
+        return (self.widget.width() * ratio / self.dpi,
+                self.widget.height() * ratio / self.dpi)
+
+    def set_dpi(self, dpi):
+        self.dpi = dpi
+
+    def fit(self, width, height):
+        if (width, height) != self.extent:
+            self.extent = (width, height)
+            self.draw()
+
+    def connect(self, press, release, move):
+        self.handlers = {'press': press, 'release': release, 'move': move}
+
+    def disconnect(self):
+        self.handlers = {}
+
+    def set_positions(self, positions):
+        self.positions = positions
+
+    def draw(self):
+        self.widget.update()
+
+    def blit(self):
+        self.widget.repaint()
+
+    def _scale(self):
+        """Returns the widget pixels per data unit along x and y.
+        """
+        return (self.widget.width() / self.extent[0],
+                self.widget.height() / self.extent[1])
+
+    def _sprites(self, scale):
+        """Returns a sprite per color state for the scale, they are rendered
+        again whenever the scale changes.
+        """
+        if scale != self.sprite_scale:
+            width = 2 * self.radius * scale[0]
+            height = 2 * self.radius * scale[1]
+            self.sprites = [_sprite(color, width, height) for color in self.palette]
+            self.sprite_scale = scale
+        return self.sprites
+
+    def paint(self, painter):
+        """Fills the widget with the face color and paints the dots.
+        """
+        painter.fillRect(self.widget.rect(), self.face_color)
+        if len(self.positions) == 0:
+            return
+        scale = self._scale()
+        sprites = self._sprites(scale)
+        # the top left corners of the sprites in widget pixels
+        corners = np.empty((len(self.positions), 2))
+        corners[:, 0] = self.positions[:, 0] * scale[0] - sprites[0].width() / 2
+        corners[:, 1] = self.widget.height() - self.positions[:, 1] * scale[1] - sprites[0].height() / 2
+        for state in np.unique(self.color_codes):
+            sprite = sprites[state]
+            for x, y in corners[self.color_codes == state].tolist():
+                painter.drawPixmap(QPointF(x, y), sprite)
+
+    def dispatch(self, kind, event):
+        """Hands a Qt mouse event to its handler as a PointerEvent.
+        """
+        handler = self.handlers.get(kind)
+        if handler is None:
+            return
+        scale = self._scale()
+        position = event.localPos()
+        handler(PointerEvent(position.x() / scale[0],
+                             (self.widget.height() - position.y()) / scale[1],
+                             BUTTONS.get(event.button()), event))
+
+
+def _color(name):
+    color = QColor(name)
+    if not color.isValid():
+        raise ValueError("{!r} is not a Qt color name.".format(name))
+    return color
+
+
+def _sprite(color, width, height):
+    """Renders an antialiased dot of the size in pixels on a transparent
+    pixmap with a pixel of margin.
+    """
+    image = QImage(int(np.ceil(width)) + 2, int(np.ceil(height)) + 2,
+                   QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.transparent)
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.setPen(Qt.NoPen)
+    painter.setBrush(color)
+    painter.drawEllipse(QRectF((image.width() - width) / 2, (image.height() - height) / 2,
+                               width, height))
+    painter.end()
+    return QPixmap.fromImage(image)
@@ -0,0 +1,142 @@
+import numpy as np
+
+class PlacementError(ValueError):
+    """Raised when the dots can not be placed with the requested separation.
+    """
+
+
+def max_dots(bounds, min_distance):
+    """Upper bound on the number of points with a pairwise distance of at
+    least min_distance that fit in bounds. It is the number of hexagonally
+    packed disks of diameter min_distance covering the grown rectangle.
+    Args:
+        bounds: the rectangle (xmin, ymin, xmax, ymax).
+        min_distance: the minimum distance between two points.
+    Returns:
+        count: an integer
+    """
+    width = bounds[2] - bounds[0] + min_distance
+    height = bounds[3] - bounds[1] + min_distance
+    return int(2 * width * height / (np.sqrt(3) * min_distance**2))
+
+
+def place_dots(count, bounds, min_distance, rng, batch_size=None, patience=20):
+    """Places count points uniformly in bounds so that no two points are
+    closer than min_distance. Candidates are drawn in batches and accepted
+    through a background grid whose cells are small enough to hold at most
+    one point, so every check only looks at the few neighbouring cells.
+    Args:
+        count: the number of points to place.
+        bounds: the rectangle (xmin, ymin, xmax, ymax) holding the points.
+        min_distance: the minimum distance between two points.
+        rng: the numpy Generator to draw from.
+        batch_size: the number of candidates drawn at once.
+        patience: the number of batches in a row without any accepted
+        candidate before giving up.
+    Returns:
+        points: a (count, 2) array
+    Raises:
+        PlacementError: if the points do not fit in bounds.
+    """
+    xmin, ymin, xmax, ymax = bounds
+    limit = max_dots(bounds, min_distance)
+    if count > limit:
+        raise PlacementError("{} dots can not be placed {} apart in a {:.2f} x {:.2f} area, "
+                             "at most {} fit.".format(count, min_distance, xmax - xmin, ymax - ymin, limit))
+    if batch_size is None:
+        batch_size = max(4 * count, 64)
+
+    cell = min_distance / np.sqrt(2)
+    columns = int(np.ceil((xmax - xmin) / cell))
+    rows = int(np.ceil((ymax - ymin) / cell))
+    # Points closer than min_distance are at most two cells apart, the grid
+    # is padded so the 5x5 neighbourhood of every cell exists.
+    grid = np.full((columns + 4, rows + 4), -1, dtype=np.intp)
+    offsets = np.arange(-2, 3)
+    points = np.zeros((count, 2))
+    placed = 0
+    failed_batches = 0
+    while placed < count:
+        candidates = rng.uniform((xmin, ymin), (xmax, ymax), (batch_size, 2))
+        cells = np.minimum(((candidates - (xmin, ymin)) / cell).astype(np.intp),
+                           (columns - 1, rows - 1)) + 2
+        # Drop every candidate which conflicts with an already placed point.
+        neighbours = grid[cells[:, 0, None, None] + offsets[:, None],
+                          cells[:, 1, None, None] + offsets].reshape(batch_size, -1)
+        distances = np.linalg.norm(points[neighbours] - candidates[:, None], axis=2)
+        free = np.all((neighbours < 0) | (distances >= min_distance), axis=1)
+        accepted = 0
+        for candidate, (i, j) in zip(candidates[free], cells[free]):
+            neighbourhood = grid[i - 2:i + 3, j - 2:j + 3]
+            others = points[neighbourhood[neighbourhood >= 0]]
+            if np.all(np.linalg.norm(others - candidate, axis=1) >= min_distance):
+                grid[i, j] = placed
+                points[placed] = candidate
+                placed += 1
+                accepted += 1
+                if placed == count:
+                    break
+        failed_batches = 0 if accepted else failed_batches + 1
+        if failed_batches == patience:
+            raise PlacementError("Only {} of {} dots could be placed {} apart in a {:.2f} x {:.2f} area."
+                                 .format(placed, count, min_distance, xmax - xmin, ymax - ymin))
+    return points
+
+
+def place_dots_batch(trials, count, bounds, min_distance, rng, patience=1000):
+    """Places count points in bounds for each of many trials at once, with
+    the same distribution as place_dots. The points are placed one at a
+    time, a candidate is drawn for every trial still missing the point and
+    kept if it is far enough from the points placed before, which are
+    looked up in a background grid per trial like in place_dots.
+    Args:
+        trials: the number of trials.
+        count: the number of points per trial.
+        bounds: the rectangle (xmin, ymin, xmax, ymax) holding the points.
+        min_distance: the minimum distance between two points.
+        rng: the numpy Generator to draw from.
+        patience: the number of draws in a row a trial may miss a point
+        before giving up.
+    Returns:
+        points: a (trials, count, 2) array
+    Raises:
+        PlacementError: if the points of some trial do not fit in bounds.
+    """
+    xmin, ymin, xmax, ymax = bounds
+    limit = max_dots(bounds, min_distance)
+    if count > limit:
+        raise PlacementError("{} dots can not be placed {} apart in a {:.2f} x {:.2f} area, "
+                             "at most {} fit.".format(count, min_distance, xmax - xmin, ymax - ymin, limit))
+    cell = min_distance / np.sqrt(2)
+    columns = int(np.ceil((xmax - xmin) / cell))
+    rows = int(np.ceil((ymax - ymin) / cell))
+    grid = np.full((trials, columns + 4, rows + 4), -1, dtype=np.intp)
+    offsets = np.arange(-2, 3)
+    points = np.zeros((trials, count, 2))
+    for placed in range(count):
+        pending = np.arange(trials)
+        draws = 1
+        for _ in range(patience):
+            candidates = rng.uniform((xmin, ymin), (xmax, ymax), (len(pending), draws, 2))
+            cells = np.minimum(((candidates - (xmin, ymin)) / cell).astype(np.intp),
+                               (columns - 1, rows - 1)) + 2
+            neighbours = grid[pending[:, None, None, None],
+                              cells[..., 0, None, None] + offsets[:, None],
+                              cells[..., 1, None, None] + offsets].reshape(len(pending), draws, -1)
+            distances = np.linalg.norm(points[pending[:, None, None], neighbours] - candidates[:, :, None],
+                                       axis=-1)
+            free = np.all((neighbours < 0) | (distances >= min_distance), axis=-1)
+            # the first free candidate of a trial is uniform over its free area
+            found = free.any(axis=1)
+            first = free.argmax(axis=1)[found]
+            points[pending[found], placed] = candidates[found, first]
+            grid[pending[found], cells[found, first, 0], cells[found, first, 1]] = placed
+            pending = pending[~found]
+            if len(pending) == 0:
+                break
+            # the trials which missed draw more candidates at once
+            draws = min(2 * draws, 64)
+        else:
+            raise PlacementError("Only {} of {} dots could be placed {} apart in a {:.2f} x {:.2f} area."
+                                 .format(placed, count, min_distance, xmax - xmin, ymax - ymin))
+    return points
@@ -0,0 +1,169 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Phases of a recorded frame.
+PHASES = {'blink': 0, 'motion': 1, 'clicking': 2}
+
+# Kinds of a recorded event.
+PRESS, RELEASE = range(2)
+
+# Outcomes of a recorded event.
+NO_SELECTION, CORRECT, INCORRECT = range(3)
+
+EVENT_DTYPE = np.dtype([('time', '<f8'), ('kind', 'u1'), ('x', '<f4'),
+                        ('y', '<f4'), ('dot', '<i4'), ('outcome', 'u1')])
+
+
+class SessionRecorder:
+    """Records the dot state of every frame and every click event of a
+    session into preallocated arrays. A finished trial is saved as .npy files
+    in the session directory by a background thread. The files can be
+    memory mapped with load_trial.
+    """
+    def __init__(self, directory, max_frames, max_events=64):
+        """
+        Args:
+            directory: the directory holding one directory per session.
+            max_frames: the number of frames preallocated per trial, the
+            buffers grow if a trial has more.
+            max_events: the number of events preallocated per trial.
+        """
+        self.directory = directory
+        self.max_frames = max_frames
+        self.max_events = max_events
+        self.session_directory = None
+        self.trial_id = None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def start_session(self, participant, header):
+        """Creates the session directory and writes the session header.
+        Args:
+            participant: the participant ID.
+            header: a json serializable dictionary describing the session.
+        Returns:
+            session_directory: the path of the session directory.
+        """
+        name = "{}_{}".format(participant, time.strftime('%Y%m%d-%H%M%S'))
+        self.session_directory = os.path.join(self.directory, name)
+        os.makedirs(self.session_directory, exist_ok=True)
+        header = dict(header, participant=participant, version=1)
+        with open(os.path.join(self.session_directory, 'session.json'), 'w') as f:
+            json.dump(header, f, indent=2)
+        return self.session_directory
+
+    def start_trial(self, trial_id, trajectory, tracked):
+        """Preallocates the buffers of a trial.
+        Args:
+            trial_id: the id of the trial in the session.
+            trajectory: the precomputed Trajectory of the trial.
+            tracked: the indices of the tracked dots.
+        """
+        dots = trajectory.positions.shape[1]
+        self.trial_id = trial_id
+        self.trajectory = trajectory
+        self.tracked = np.array(sorted(tracked), dtype=np.int32)
+        self.frame_count = 0
+        self.frame_times = np.empty(self.max_frames)
+        self.frame_phases = np.empty(self.max_frames, dtype=np.uint8)
+        self.frame_positions = np.empty((self.max_frames, dots, 2), dtype=np.float32)
+        self.frame_colors = np.empty((self.max_frames, dots), dtype=np.uint8)
+        self.event_count = 0
+        self.events = np.empty(self.max_events, dtype=EVENT_DTYPE)
+
+    def record_frame(self, t, phase, positions, color_codes):
+        """Copies the state of a shown frame into the buffers.
+        Args:
+            t: the paint time in s since the start of the trial.
+            phase: the phase of the trial, a key of PHASES.
+            positions: an (n, 2) array of the shown dot centers.
+            color_codes: an (n,) array of the shown color states.
+        """
+        if self.trial_id is None:
+            return
+        if self.frame_count == len(self.frame_times):
+            self.frame_times, self.frame_phases, self.frame_positions, self.frame_colors = \
+                [_grow(array) for array in (self.frame_times, self.frame_phases,
+                                            self.frame_positions, self.frame_colors)]
+        i = self.frame_count
+        self.frame_times[i] = t
+        self.frame_phases[i] = PHASES[phase]
+        self.frame_positions[i] = positions
+        self.frame_colors[i] = color_codes
+        self.frame_count += 1
+
+    def record_event(self, t, kind, x, y, dot, outcome):
+        """Copies a click event into the buffers.
+        Args:
+            t: the event time in s since the start of the trial.
+            kind: PRESS or RELEASE.
+            x, y: the event location in data units, None outside the axis.
+            dot: the index of the dot under the event or None.
+            outcome: NO_SELECTION, CORRECT or INCORRECT.
+        """
+        if self.trial_id is None:
+            return
+        if self.event_count == len(self.events):
+            self.events = _grow(self.events)
+        self.events[self.event_count] = (t, kind, np.nan if x is None else x,
+                                         np.nan if y is None else y,
+                                         -1 if dot is None else dot, outcome)
+        self.event_count += 1
+
+    def finish_trial(self):
+        """Hands the recorded trial to the background thread which saves it.
+        Returns:
+            future: a Future of the trial directory.
+        """
+        if self.trial_id is None or self.session_directory is None:
+            return None
+        arrays = {'trajectory_positions': self.trajectory.positions.astype(np.float32),
+                  'trajectory_velocities': self.trajectory.velocities.astype(np.float32),
+                  'tracked': self.tracked,
+                  'frame_times': self.frame_times[:self.frame_count],
+                  'frame_phases': self.frame_phases[:self.frame_count],
+                  'frame_positions': self.frame_positions[:self.frame_count],
+                  'frame_colors': self.frame_colors[:self.frame_count],
+                  'events': self.events[:self.event_count]}
+        path = os.path.join(self.session_directory, 'trial_{:02d}'.format(self.trial_id))
+        self.trial_id = None
+        return self.executor.submit(_save_trial, path, arrays)
+
+    def close(self):
+        """Waits for the pending trials to be saved.
+        """
+        self.executor.shutdown(wait=True)
+
+
+def _grow(array):
+    return np.concatenate([array, np.empty_like(array)])
+
+
+def _save_trial(path, arrays):
+    os.makedirs(path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, name + '.npy'), array)
+    return path
+
+
+def load_trial(path, mmap=True):
+    """Loads the arrays of a recorded trial.
+    Args:
+        path: the trial directory.
+        mmap: whether to memory map the arrays instead of reading them.
+    Returns:
+        arrays: a dictionary of the arrays by name.
+    """
+    mode = 'r' if mmap else None
+    return {name[:-len('.npy')]: np.load(os.path.join(path, name), mmap_mode=mode)
+            for name in sorted(os.listdir(path)) if name.endswith('.npy')}
+
+
+def load_session(path):
+    """Reads the header of a recorded session.
+    """
+    with open(os.path.join(path, 'session.json')) as f:
+        return json.load(f)
@@ -0,0 +1,198 @@
+"""Renders recorded trials without a display.
+
+    python replay.py SESSION_DIRECTORY OUTPUT_DIRECTORY [--format mp4|png]
+
+The frames are rebuilt with the Agg backend from the dot positions and color
+states recorded by SessionRecorder, so they show what the participant saw.
+Trials, or chunks of frames for image sequences, are rendered in a process
+pool.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from config import INTERVAL
+from dotrenderer import DotRenderer, NORMAL, BLINKING, SELECTED, INCORRECT, \
+                        UNSELECTED
+from recorder import PRESS, RELEASE, CORRECT, INCORRECT as INCORRECT_OUTCOME, \
+                     load_session, load_trial
+
+HOLD = 0.5 # s the last frame is shown after the last event
+
+
+def trial_directories(session_directory):
+    return sorted(os.path.join(session_directory, name) for name in os.listdir(session_directory)
+                  if name.startswith('trial_'))
+
+
+def frame_states(arrays, fps):
+    """Resamples a recorded trial at a constant frame rate. Every video frame
+    shows the last recorded frame painted before it. The click events from
+    the last frame on, the one which starts clicking, change the colors like
+    they did in the application. The earlier ones did not change what was
+    shown, so their colors are already in the recorded frames.
+    Args:
+        arrays: the arrays returned by load_trial.
+        fps: the frame rate of the output.
+    Returns:
+        positions: a (frames, dots, 2) array.
+        colors: a (frames, dots) array of color states.
+    """
+    frame_times = np.asarray(arrays['frame_times'])
+    events = np.asarray(arrays['events'])
+    end = max(frame_times[-1], events['time'][-1] if len(events) else 0) + HOLD
+    times = np.arange(0, end, 1 / fps)
+    shown = np.maximum(np.searchsorted(frame_times, times, side='right') - 1, 0)
+    positions = np.asarray(arrays['frame_positions'])[shown]
+    colors = np.array(arrays['frame_colors'])[shown]
+
+    tracked = set(np.asarray(arrays['tracked']).tolist())
+    clicked = []
+    highlighted = None
+    for event in events[events['time'] >= frame_times[-1]]:
+        after = times >= event['time']
+        dot = int(event['dot'])
+        if event['kind'] == PRESS and dot >= 0 and dot not in clicked:
+            highlighted = dot
+            colors[after, dot] = SELECTED
+        elif event['kind'] == RELEASE:
+            if event['outcome'] in (CORRECT, INCORRECT_OUTCOME):
+                clicked.append(dot)
+                colors[after, dot] = BLINKING if event['outcome'] == CORRECT else INCORRECT
+                if len(clicked) == len(tracked):
+                    unselected = [other for other in tracked if other not in clicked]
+                    colors[np.ix_(after, unselected)] = UNSELECTED
+            elif highlighted is not None and highlighted not in clicked:
+                colors[after, highlighted] = NORMAL
+            highlighted = None
+    return positions, colors
+
+
+class FrameRenderer:
+    """Draws frames of a session into an Agg canvas with a DotRenderer, like
+    the application draws them on screen.
+    """
+    def __init__(self, header, dpi):
+        self.figure = Figure(figsize=(header['width'], header['height']), dpi=dpi,
+                             facecolor=header['face_color'])
+        self.canvas = FigureCanvasAgg(self.figure)
+        ax = self.figure.add_subplot(111)
+        ax.set_xlim([0, header['width']])
+        ax.set_ylim([0, header['height']])
+        ax.axis('off')
+        self.figure.subplots_adjust(left=0.0, bottom=0.0, right=1.0, top=1.0)
+        self.renderer = DotRenderer(self.canvas, ax, header['radius'], header['palette'])
+        self.canvas.draw()
+
+    @property
+    def size(self):
+        width, height = self.canvas.get_width_height()
+        return width, height
+
+    def render(self, positions, colors):
+        """Returns the RGBA pixels of one frame.
+        """
+        if len(self.renderer.color_codes) != len(positions):
+            self.renderer.set_dots(positions)
+        self.renderer.set_positions(positions)
+        self.renderer.set_colors(slice(None), colors)
+        self.renderer.blit()
+        return np.asarray(self.canvas.buffer_rgba())
+
+
+def render_images(session_directory, trial_directory, output_directory, start, stop, fps, dpi):
+    """Writes the frames start to stop of a trial as png files.
+    """
+    from PIL import Image
+    header = load_session(session_directory)
+    positions, colors = frame_states(load_trial(trial_directory), fps)
+    frames = FrameRenderer(header, dpi)
+    os.makedirs(output_directory, exist_ok=True)
+    for i in range(start, min(stop, len(positions))):
+        Image.fromarray(frames.render(positions[i], colors[i])).save(
+            os.path.join(output_directory, 'frame_{:05d}.png'.format(i)))
+    return output_directory
+
+
+def render_video(session_directory, trial_directory, output_path, fps, dpi):
+    """Pipes the frames of a trial to ffmpeg.
+    """
+    header = load_session(session_directory)
+    positions, colors = frame_states(load_trial(trial_directory), fps)
+    frames = FrameRenderer(header, dpi)
+    width, height = frames.size
+    command = ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgba',
+               '-s', '{}x{}'.format(width, height), '-r', str(fps), '-i', '-',
+               '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p', output_path]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE)
+    for frame in range(len(positions)):
+        process.stdin.write(frames.render(positions[frame], colors[frame]).tobytes())
+    process.stdin.close()
+    if process.wait() != 0:
+        raise RuntimeError("ffmpeg failed to write {}".format(output_path))
+    return output_path
+
+
+def export_session(session_directory, output_directory, image_format='mp4', fps=1000 / INTERVAL,
+                   dpi=50, workers=None, chunk_size=100, trials=None):
+    """Renders the trials of a recorded session in a process pool.
+    Args:
+        session_directory: the directory written by SessionRecorder.
+        output_directory: the directory the videos or images are written to.
+        image_format: 'mp4' for one video per trial or 'png' for one image
+        sequence per trial.
+        fps: the frame rate of the output.
+        dpi: the resolution of the frames, the size in inches is the one of
+        the recorded figure.
+        workers: the number of worker processes.
+        chunk_size: the number of png frames rendered by one task.
+        trials: the ids of the trials to render, all if None.
+    Returns:
+        paths: the written videos or image directories.
+    """
+    if image_format == 'mp4' and shutil.which('ffmpeg') is None:
+        raise RuntimeError("ffmpeg was not found, use the png format instead.")
+    os.makedirs(output_directory, exist_ok=True)
+    directories = [directory for directory in trial_directories(session_directory)
+                   if trials is None or int(directory[-2:]) in trials]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for directory in directories:
+            name = os.path.basename(directory)
+            if image_format == 'mp4':
+                futures.append(executor.submit(render_video, session_directory, directory,
+                                               os.path.join(output_directory, name + '.mp4'), fps, dpi))
+                continue
+            frame_count = len(frame_states(load_trial(directory), fps)[0])
+            for start in range(0, frame_count, chunk_size):
+                futures.append(executor.submit(render_images, session_directory, directory,
+                                               os.path.join(output_directory, name), start,
+                                               start + chunk_size, fps, dpi))
+        return sorted(set(future.result() for future in futures))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('session_directory')
+    parser.add_argument('output_directory')
+    parser.add_argument('--format', choices=['mp4', 'png'], default='mp4')
+    parser.add_argument('--fps', type=float, default=1000 / INTERVAL)
+    parser.add_argument('--dpi', type=float, default=50)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=100,
+                        help='the number of png frames rendered by one task')
+    parser.add_argument('--trials', type=int, nargs='*', default=None)
+    args = parser.parse_args(argv)
+    for path in export_session(args.session_directory, args.output_directory, args.format,
+                               args.fps, args.dpi, args.workers, args.chunk_size, args.trials):
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
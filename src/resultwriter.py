@@ -0,0 +1,139 @@
+import collections
+import os
+import queue
+import threading
+import time
+
+
+class ResultWriteError(Exception):
+    """Raised once the thread of a ResultWriter failed and the lines are no
+    longer written.
+    """
+
+
+class ResultWriter:
+    """Appends lines to the files of a session directory from a background
+    thread. write never blocks the caller: lines go through a bounded queue
+    and wait in an overflow list while the queue is full. The thread flushes
+    after every flush_every lines, or once flush_interval s have passed with
+    lines pending, and can fsync every flush. An error of the thread stops
+    it and is raised from the next write or close.
+    """
+    def __init__(self, directory, flush_every=1, flush_interval=1.0, fsync=True, max_queue=4096):
+        """
+        Args:
+            directory: the directory the files are written in.
+            flush_every: the number of lines written between two flushes.
+            flush_interval: the longest time in s a written line waits for a
+            flush.
+            fsync: whether every flush is followed by os.fsync.
+            max_queue: the size of the queue to the thread.
+        """
+        self.directory = directory
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.queue = queue.Queue(max_queue)
+        self.overflow = collections.deque()
+        self.files = {}
+        self.error = None
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name='ResultWriter', daemon=True)
+        self.thread.start()
+
+    def write(self, name, line):
+        """Queues a line to be appended to a file of the directory.
+        Args:
+            name: the name of the file.
+            line: the text of the line, without the line break.
+        Raises:
+            ResultWriteError: if the thread failed.
+        """
+        self._check()
+        self.overflow.append((name, line))
+        self._drain_overflow()
+
+    def _drain_overflow(self):
+        while self.overflow:
+            try:
+                self.queue.put_nowait(self.overflow[0])
+            except queue.Full:
+                return
+            self.overflow.popleft()
+
+    def close(self, wait=True, timeout=5.0):
+        """Stops the thread once every queued line is written. Closing again
+        only waits for the thread.
+        Args:
+            wait: whether to wait for the thread to finish.
+            timeout: the longest time in s to wait for the thread.
+        Raises:
+            ResultWriteError: if the thread failed or did not take the lines
+            within timeout.
+        """
+        deadline = time.monotonic() + timeout
+        if not self.closed:
+            self.closed = True
+            self.overflow.append(None)
+        while self.overflow:
+            self._check()
+            try:
+                self.queue.put(self.overflow[0], timeout=max(min(deadline - time.monotonic(),
+                                                                 self.flush_interval), 0))
+            except queue.Full:
+                if time.monotonic() >= deadline:
+                    raise ResultWriteError("{} lines for {} were not written within {:g} s."
+                                           .format(len(self.overflow) - 1, self.directory, timeout))
+                continue
+            self.overflow.popleft()
+        if wait:
+            self.thread.join(max(deadline - time.monotonic(), 0))
+            self._check()
+
+    def _check(self):
+        if self.error is not None:
+            raise ResultWriteError("Results are no longer written to {}: {}"
+                                   .format(self.directory, self.error)) from self.error
+
+    def _run(self):
+        try:
+            self._write_lines()
+        except Exception as error:
+            self.error = error
+        for f in self.files.values():
+            try:
+                f.close()
+            except OSError:
+                pass
+
+    def _write_lines(self):
+        pending = 0
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                name, line = item
+                self._file(name).write(line + '\n')
+                pending += 1
+            if pending and (pending >= self.flush_every or
+                            time.monotonic() - last_flush >= self.flush_interval):
+                self._flush()
+                pending = 0
+                last_flush = time.monotonic()
+        self._flush()
+
+    def _file(self, name):
+        if name not in self.files:
+            self.files[name] = open(os.path.join(self.directory, name), 'a')
+        return self.files[name]
+
+    def _flush(self):
+        for f in self.files.values():
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
@@ -0,0 +1,45 @@
+import time
+
+class SimulationClock:
+    """Turns elapsed monotonic time into fixed simulation steps. The time
+    which is left over after the last whole step stays in an accumulator,
+    so the render can interpolate between two simulation states.
+    """
+    def __init__(self, step):
+        """
+        Args:
+            step: the fixed simulation step in s.
+        """
+        self.step = step
+        self.start()
+
+    def start(self, origin=None):
+        """Restarts the clock.
+        Args:
+            origin: the time.perf_counter() value the clock starts at, now if
+            None.
+        """
+        self.origin = time.perf_counter() if origin is None else origin
+        self.last = self.origin
+        self.accumulator = 0.0
+        self.steps = 0
+
+    def advance(self):
+        """Adds the time since the last call to the accumulator and turns it
+        into whole steps.
+        Returns:
+            steps: the number of steps taken by this call.
+        """
+        now = time.perf_counter()
+        self.accumulator += max(now - self.last, 0.0)
+        self.last = now
+        steps = int(self.accumulator // self.step)
+        self.accumulator -= steps * self.step
+        self.steps += steps
+        return steps
+
+    @property
+    def alpha(self):
+        """The fraction of the next step which has already elapsed.
+        """
+        return self.accumulator / self.step
@@ -0,0 +1,172 @@
+"""Predicts the accuracy of the tracking task with a model observer.
+
+    python simulate.py [--trials N] [--dots 8 10] [--velocities 2 3 4]
+                       [--loads 2 3 4 5] [--motion NAME] [--observer nearest]
+                       [--noise 0.1]
+                       [--workers N] [--output accuracy.csv]
+
+Trials are generated and moved like in the task, without Qt, many trials
+at a time: with the dot collisions, swept collisions and trajectory
+constraints of config, and by default with the motion TRIAL_MOTION gives
+the trials of every load. The observer sees the dots at the frames the task
+would display and its clicks are scored like a participant's. Every
+condition, a number of dots, a velocity and a load, is simulated in
+batches in a process pool.
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+
+from analyze import capacity, write_csv
+from config import BLINKING_DURATION, CANDIDATE_BATCH, DOT_COLLISIONS, DT, INTERVAL, \
+                   MAX_CANDIDATES, MOTION_MODELS, NUMBER_OF_DOTS, RADIUS, SWEPT_COLLISIONS, \
+                   TRAJECTORY_CONSTRAINTS, TRIAL_DICTIONARY, TRIAL_DURATION, TRIAL_MOTION, VELOCITY
+from constraints import make_constraints
+from observers import OBSERVERS, score
+from trajectory import TrajectoryGenerator
+
+# The data area of a 1920 x 1080 screen at the default 100 dpi, in inches.
+WIDTH = 19.2
+HEIGHT = 10.8
+
+
+class Boundary:
+    """The data area the dots move in.
+    """
+    def __init__(self, width, height):
+        self.WIDTH = width
+        self.HEIGHT = height
+
+
+def simulate_batch(condition, trials, seed, observer, boundary, motion=None):
+    """Simulates a batch of trials of one condition. Runs in a worker process.
+    Args:
+        condition: a (number_of_dots, velocity, load) tuple.
+        trials: the number of trials in the batch.
+        seed: the seed of the batch.
+        observer: the Observer picking the dots.
+        boundary: the Boundary the dots move in.
+        motion: a dictionary of motion models, see make_models.
+    Returns:
+        condition: the condition of the batch.
+        counts: an array of the number of trials by number of correct clicks.
+    """
+    number_of_dots, velocity, load = condition
+    rng = np.random.default_rng(seed)
+    # built like the one of the Window, so the trials are the ones of the task
+    generator = TrajectoryGenerator(boundary, number_of_dots, RADIUS, velocity, DT, DOT_COLLISIONS,
+                                    SWEPT_COLLISIONS, make_constraints(TRAJECTORY_CONSTRAINTS),
+                                    CANDIDATE_BATCH, MAX_CANDIDATES)
+    steps = int(round((TRIAL_DURATION - BLINKING_DURATION) / 1000 / DT))
+    positions, _ = generator.generate_batch(rng, trials, steps, motion, load)
+    observer.start(positions[:, 0], np.broadcast_to(np.arange(load), (trials, load)), rng)
+    # the task displays a frame every INTERVAL ms
+    every = max(1, int(round(INTERVAL / 1000 / DT)))
+    for step in range(1, steps + 1):
+        if step % every == 0 or step == steps:
+            observer.observe(positions[:, step], rng)
+    correct = score(observer.respond(rng), load, number_of_dots, rng)
+    return condition, np.bincount(correct, minlength=load + 1)
+
+
+def task_motions(load):
+    """Returns the names in MOTION_MODELS of the motions of the trials of
+    TRIAL_DICTIONARY with load tracked dots, one per trial, 'constant' if
+    the task has no such trial.
+    """
+    names = [TRIAL_MOTION.get(trial, 'constant')
+             for trial, trial_load in sorted(TRIAL_DICTIONARY.items()) if trial_load == load]
+    return names or ['constant']
+
+
+def simulate(conditions, trials, observer, boundary, workers=None, batch_size=2000, seed=None,
+             motion=None):
+    """Simulates trials of every condition in a process pool.
+    Args:
+        conditions: a list of (number_of_dots, velocity, load) tuples.
+        trials: the number of trials per condition.
+        observer: the Observer picking the dots.
+        boundary: the Boundary the dots move in.
+        workers: the number of worker processes.
+        batch_size: the number of trials simulated at once.
+        seed: the seed of the whole simulation.
+        motion: the name in MOTION_MODELS of the motion of every trial, None
+        splits the trials of a load evenly over the motions of its trials in
+        the task.
+    Returns:
+        rows: a list of dictionaries, one per condition.
+    """
+    batches = []
+    for condition in conditions:
+        names = [motion] if motion is not None else task_motions(condition[2])
+        shares = dict.fromkeys(names, 0)
+        for name, share in zip(names, np.array_split(np.arange(trials), len(names))):
+            shares[name] += len(share)
+        for name, share in shares.items():
+            batches += [(condition, min(batch_size, share - start), MOTION_MODELS[name])
+                        for start in range(0, share, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    counts = {condition: 0 for condition in conditions}
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        batch_conditions, sizes, motions = zip(*batches)
+        results = executor.map(simulate_batch, batch_conditions, sizes, seeds,
+                               [observer] * len(batches), [boundary] * len(batches), motions)
+        for condition, batch_counts in results:
+            counts[condition] = counts[condition] + batch_counts
+    rows = []
+    for condition in conditions:
+        number_of_dots, velocity, load = condition
+        accuracy = np.arange(load + 1) / load
+        mean = np.average(accuracy, weights=counts[condition])
+        rows.append({'dots': number_of_dots,
+                     'velocity': velocity,
+                     'load': load,
+                     'trials': int(counts[condition].sum()),
+                     'accuracy': mean,
+                     'accuracy_sd': np.sqrt(np.average((accuracy - mean)**2, weights=counts[condition])),
+                     'capacity': capacity(mean * load, load, number_of_dots)})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trials', type=int, default=10000,
+                        help='the number of trials per condition')
+    parser.add_argument('--dots', type=int, nargs='+', default=[NUMBER_OF_DOTS])
+    parser.add_argument('--velocities', type=float, nargs='+', default=[float(VELOCITY)])
+    parser.add_argument('--loads', type=int, nargs='+',
+                        default=sorted(set(TRIAL_DICTIONARY.values())))
+    parser.add_argument('--motion', choices=sorted(MOTION_MODELS), default=None,
+                        help='the motion models of MOTION_MODELS every trial moves with, '
+                             'the ones TRIAL_MOTION gives the trials of the task by default')
+    parser.add_argument('--observer', choices=sorted(OBSERVERS), default='nearest')
+    parser.add_argument('--noise', type=float, default=0.1,
+                        help='the perception noise of the observer in data units')
+    parser.add_argument('--width', type=float, default=WIDTH)
+    parser.add_argument('--height', type=float, default=HEIGHT)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='the number of worker processes')
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default=None,
+                        help='writes the csv there instead of printing it')
+    args = parser.parse_args(argv)
+
+    conditions = [(dots, velocity, load) for dots, velocity, load
+                  in product(args.dots, args.velocities, args.loads) if load <= dots]
+    rows = simulate(conditions, args.trials, OBSERVERS[args.observer](args.noise),
+                    Boundary(args.width, args.height), args.workers, args.batch_size, args.seed,
+                    args.motion)
+    if args.output is None:
+        write_csv(rows, sys.stdout)
+        return
+    with open(args.output, 'w') as f:
+        write_csv(rows, f)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+import json
+import socket
+import threading
+import time
+
+import numpy as np
+
+from recorder import PHASES
+
+# Kinds of a telemetry record.
+FRAME, CLICK, TRIAL_START, TRIAL_END, SESSION_START, SESSION_END = range(6)
+KINDS = ['frame', 'click', 'trial_start', 'trial_end', 'session_start', 'session_end']
+
+# value and extra of the kinds:
+#   frame: the time since the previous paint and the time from the timer
+#   callback to the paint in ms.
+#   click: the response time in ms and 1 for a correct dot, 0 otherwise.
+#   trial_start: the number of tracked dots.
+#   trial_end: the trial duration in ms and the number of correct clicks.
+RECORD_DTYPE = np.dtype([('time', '<f8'), ('kind', 'u1'), ('trial', '<i2'), ('phase', 'u1'),
+                         ('dot', '<i4'), ('value', '<f4'), ('extra', '<f4')])
+
+PHASE_NAMES = {code: phase for phase, code in PHASES.items()}
+
+
+class TelemetryBuffer:
+    """A ring buffer of telemetry records with a single writer, the GUI
+    thread, and any number of reader threads, without a lock. The writer
+    fills the slot of a record before it counts it and never waits. A reader
+    copies the counted records and drops the ones the writer may have
+    overwritten meanwhile.
+    """
+    def __init__(self, capacity=4096):
+        """
+        Args:
+            capacity: the number of records kept, the oldest ones are
+            overwritten.
+        """
+        self.records = np.zeros(capacity, dtype=RECORD_DTYPE)
+        self.count = 0
+
+    def publish(self, kind, trial, phase=0, dot=-1, value=np.nan, extra=np.nan):
+        """Writes a record stamped with the current perf_counter time.
+        Args:
+            kind: one of FRAME, CLICK, TRIAL_START, TRIAL_END, SESSION_START
+            and SESSION_END.
+            trial: the id of the trial.
+            phase: the code of the phase in PHASES of a frame.
+            dot: the index of the clicked dot.
+            value, extra: the values of the kind.
+        """
+        self.records[self.count % len(self.records)] = (time.perf_counter(), kind, trial, phase,
+                                                        dot, value, extra)
+        self.count += 1
+
+    def read(self, since=0):
+        """Copies the records from the sequence number since on which are
+        still in the buffer.
+        Returns:
+            sequence: an array of the sequence numbers of the records.
+            records: an array of RECORD_DTYPE.
+        """
+        capacity = len(self.records)
+        end = self.count
+        sequence = np.arange(max(since, end - capacity, 0), end)
+        records = self.records[sequence % capacity]
+        # the writer may be filling the slot of record self.count
+        valid = sequence > self.count - capacity
+        return sequence[valid], records[valid]
+
+
+class TelemetryServer:
+    """Serves the telemetry of a station as JSON over HTTP from daemon
+    threads:
+
+        /status             the progress of the session, the last click and
+                            the pacing of the last frames.
+        /events?since=N     the records from the sequence number N on.
+
+    The server only reads the buffer, so a request never holds up the GUI
+    thread.
+    """
+    def __init__(self, buffer, address, interval, late_factor=1.5, frames=100):
+        """
+        Args:
+            buffer: the TelemetryBuffer written by the Window.
+            address: the (host, port) pair to listen on, port 0 picks a free
+            port.
+            interval: the expected time between two frames in ms.
+            late_factor: a frame is late once the time since the previous
+            paint exceeds late_factor * interval.
+            frames: the number of last frames of the frame stats.
+        """
+        self.buffer = buffer
+        self.interval = interval
+        self.late_factor = late_factor
+        self.frames = frames
+        # http.server takes tens of ms to import, which is only paid when
+        # the telemetry is served
+        from http.server import ThreadingHTTPServer
+
+        self.station = socket.gethostname()
+        self.server = ThreadingHTTPServer(address, _handler(self))
+        self.server.daemon_threads = True
+        self.address = self.server.server_address
+        self.thread = threading.Thread(target=self.server.serve_forever, name='TelemetryServer', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def close(self):
+        """Stops serving and releases the address.
+        """
+        if self.thread.is_alive():
+            self.server.shutdown()
+        self.server.server_close()
+
+    def status(self):
+        """Summarizes the records since the last session start. The trials
+        of a session run in order of their ids, so the trials done are told
+        by the id of the last trial.
+        Returns:
+            status: a dictionary ready for json.
+        """
+        sequence, records = self.buffer.read()
+        now = time.perf_counter()
+        kinds = records['kind']
+        sessions = np.flatnonzero(kinds == SESSION_START)
+        if len(sessions):
+            records = records[sessions[-1]:]
+            kinds = records['kind']
+        status = {'station': self.station,
+                  'time': time.time(),
+                  'records': int(self.buffer.count),
+                  'state': 'idle',
+                  'trial': None,
+                  'load': None,
+                  'phase': None,
+                  'clicks': 0,
+                  'correct': 0,
+                  'trials_done': 0,
+                  'last_click': None,
+                  'frames': self.frame_stats(records[kinds == FRAME], now)}
+        if len(sessions) and kinds[-1] != SESSION_END:
+            status['state'] = 'session'
+        starts = np.flatnonzero(kinds == TRIAL_START)
+        if len(starts):
+            trial = records[starts[-1]:]
+            status['trial'] = status['trials_done'] = int(trial['trial'][0])
+            status['load'] = int(trial['value'][0])
+            frames = trial[trial['kind'] == FRAME]
+            if len(frames):
+                status['phase'] = PHASE_NAMES[int(frames['phase'][-1])]
+            clicks = trial[trial['kind'] == CLICK]
+            status['clicks'] = len(clicks)
+            status['correct'] = int(np.sum(clicks['extra'] == 1))
+            if len(clicks):
+                status['last_click'] = {'dot': int(clicks['dot'][-1]),
+                                        'correct': bool(clicks['extra'][-1] == 1),
+                                        'rt_ms': float(clicks['value'][-1]),
+                                        'age_s': now - float(clicks['time'][-1])}
+            if np.any(trial['kind'] == TRIAL_END):
+                status['phase'] = 'done'
+                status['trials_done'] += 1
+        return status
+
+    def frame_stats(self, frames, now):
+        """Returns the pacing of the last frames like the frame timing file.
+        """
+        frames = frames[-self.frames:]
+        intervals = frames['value'][~np.isnan(frames['value'])]
+        if len(intervals) == 0:
+            return {'frames': len(frames)}
+        return {'frames': len(frames),
+                'mean_interval_ms': float(np.mean(intervals)),
+                'jitter_ms': float(np.std(intervals)),
+                'max_interval_ms': float(np.max(intervals)),
+                'late_frames': int(np.sum(intervals > self.late_factor * self.interval)),
+                'mean_work_ms': float(np.nanmean(frames['extra'])),
+                'age_s': now - float(frames['time'][-1])}
+
+    def events(self, since):
+        """Returns the records from the sequence number since on, their
+        times as seconds since the epoch.
+        """
+        sequence, records = self.buffer.read(since)
+        offset = time.time() - time.perf_counter()
+        return [{'sequence': int(s),
+                 'time': float(record['time']) + offset,
+                 'kind': KINDS[record['kind']],
+                 'trial': int(record['trial']),
+                 'phase': PHASE_NAMES.get(int(record['phase'])) if record['kind'] == FRAME else None,
+                 'dot': int(record['dot']),
+                 'value': _number(record['value']),
+                 'extra': _number(record['extra'])}
+                for s, record in zip(sequence.tolist(), records)]
+
+
+def _handler(telemetry):
+    from http.server import BaseHTTPRequestHandler
+    from urllib.parse import parse_qs, urlparse
+
+    class TelemetryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/status':
+                body = telemetry.status()
+            elif url.path == '/events':
+                try:
+                    since = int(parse_qs(url.query).get('since', ['0'])[0])
+                except ValueError:
+                    self.send_error(400, "since must be an integer")
+                    return
+                body = telemetry.events(since)
+            else:
+                self.send_error(404)
+                return
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return TelemetryHandler
+
+
+def _number(value):
+    """Turns a numpy float into a float for json, nan into None.
+    """
+    return None if np.isnan(value) else float(value)
@@ -0,0 +1,209 @@
+import time
+
+import numpy as np
+
+from constraints import ConstraintError, validate
+from motionengine import MotionEngine
+from motionmodels import make_models
+from placement import place_dots, place_dots_batch
+
+class Trajectory:
+    """The precomputed path of every dot of a trial.
+    Attributes:
+        positions: a (frames, dots, 2) array of dot centers.
+        velocities: a (frames, dots, 2) array of dot velocities.
+        seed: the seed the trajectory was generated from.
+    """
+    def __init__(self, positions, velocities, seed):
+        self.positions = positions
+        self.velocities = velocities
+        self.seed = seed
+
+    def __len__(self):
+        return len(self.positions)
+
+
+class TrajectoryGenerator:
+    """Generates the dots of a trial and simulates their motion up front.
+    Every trial is generated from its own seed, which is derived from the
+    session seed and the trial id, so a trial can always be reproduced.
+    """
+    def __init__(self, boundary, number_of_dots, radius, velocity, dt, dot_collisions=False,
+                 swept_collisions=False, constraints=(), batch_size=16, max_candidates=1024,
+                 time_budget=None):
+        """
+        Args:
+            boundary: an object with WIDTH and HEIGHT attributes.
+            number_of_dots: the number of dots in a trial.
+            radius: the radius of the dots.
+            velocity: the speed of the dots in data units / s.
+            dt: the time step between two frames.
+            dot_collisions: whether the dots bounce off each other.
+            swept_collisions: whether the dots bounce off the boundary at
+            the exact time they touch it.
+            constraints: the Constraint objects a trajectory has to meet.
+            batch_size: the largest number of candidate trajectories
+            simulated and checked at once, the batches grow from one while
+            the candidates are rejected.
+            max_candidates: the number of candidates tried before giving up.
+            time_budget: the time in s a trial may take to generate before
+            giving up, None for no limit.
+        """
+        self.boundary = boundary
+        self.number_of_dots = number_of_dots
+        self.radius = radius
+        self.velocity = velocity
+        self.dt = dt
+        self.dot_collisions = dot_collisions
+        self.swept_collisions = swept_collisions
+        self.constraints = list(constraints)
+        self.batch_size = batch_size
+        self.max_candidates = max_candidates
+        self.time_budget = time_budget
+
+    def generate(self, session_seed, trial_id, steps, motion=None, load=0):
+        """Generates the dots of a trial and their positions over time. With
+        constraints, candidate trajectories are simulated in growing batches
+        and the first one which meets every constraint is kept.
+        Args:
+            session_seed: the seed of the session.
+            trial_id: the id of the trial in the session.
+            steps: the number of motion steps, the trajectory holds steps + 1
+            frames including the starting positions.
+            motion: a dictionary of motion models and their arguments, see
+            make_models, None moves the dots at constant velocity.
+            load: the number of tracked dots, which are the first dots.
+        Returns:
+            trajectory: a Trajectory object.
+        Raises:
+            PlacementError: if the dots do not fit in the boundary.
+            ConstraintError: if no candidate meets the constraints within
+            max_candidates and the time budget.
+        """
+        start = time.perf_counter()
+        seed = [session_seed, trial_id]
+        rng = np.random.default_rng(seed)
+        if not self.constraints:
+            return Trajectory(*self.simulate(rng, steps, motion, load), seed)
+        tried = 0
+        batch = 1
+        while tried < self.max_candidates:
+            batch = min(batch, self.max_candidates - tried)
+            positions, velocities = self.simulate(rng, steps, motion, load, batch)
+            valid = np.flatnonzero(validate(self.constraints, positions, load, self.boundary))
+            if len(valid):
+                # copied so the rejected candidates are freed
+                return Trajectory(positions[valid[0]].copy(), velocities[valid[0]].copy(), seed)
+            tried += batch
+            batch = min(2 * batch, self.batch_size)
+            if self.time_budget is not None and time.perf_counter() - start > self.time_budget:
+                raise ConstraintError("No trajectory of {} candidates with {} dots met the constraints "
+                                      "within {:g} s.".format(tried, self.number_of_dots, self.time_budget))
+        raise ConstraintError("No trajectory of {} candidates with {} dots met the constraints."
+                              .format(self.max_candidates, self.number_of_dots))
+
+    def generate_batch(self, rng, trials, steps, motion=None, load=0):
+        """Generates the positions over time of many trials at once. Every
+        trial is drawn like one of generate, the candidates are simulated in
+        batches and the ones which meet every constraint are kept.
+        Args:
+            rng: the numpy Generator to draw from.
+            trials: the number of trials.
+            steps: the number of motion steps.
+            motion: a dictionary of motion models and their arguments.
+            load: the number of tracked dots.
+        Returns:
+            positions, velocities: (trials, steps + 1, number_of_dots, 2)
+            arrays.
+        Raises:
+            PlacementError: if the dots do not fit in the boundary.
+            ConstraintError: if fewer than trials of trials * max_candidates
+            candidates meet the constraints.
+        """
+        if not self.constraints:
+            return self.simulate(rng, steps, motion, load, trials)
+        positions = []
+        velocities = []
+        found = 0
+        tried = 0
+        while found < trials:
+            if tried >= trials * self.max_candidates:
+                raise ConstraintError("Only {} of {} candidates with {} dots met the constraints."
+                                      .format(found, tried, self.number_of_dots))
+            batch = min(trials - found, trials * self.max_candidates - tried)
+            candidates, candidate_velocities = self.simulate(rng, steps, motion, load, batch)
+            valid = np.flatnonzero(validate(self.constraints, candidates, load, self.boundary))[:trials - found]
+            positions.append(candidates[valid])
+            velocities.append(candidate_velocities[valid])
+            found += len(valid)
+            tried += batch
+        return np.concatenate(positions), np.concatenate(velocities)
+
+    def simulate(self, rng, steps, motion=None, load=0, candidates=None):
+        """Places the dots and simulates their motion.
+        Args:
+            rng: the numpy Generator to draw from.
+            steps: the number of motion steps.
+            motion: a dictionary of motion models and their arguments.
+            load: the number of tracked dots.
+            candidates: the number of trajectories simulated at once or None
+            for one.
+        Returns:
+            positions, velocities: (steps + 1, number_of_dots, 2) arrays,
+            (candidates, steps + 1, number_of_dots, 2) for many.
+        Raises:
+            PlacementError: if the dots do not fit in the boundary.
+        """
+        if candidates is not None and self.dot_collisions:
+            # the dot collisions only run on one trajectory at a time
+            paths = [self.simulate(rng, steps, motion, load) for _ in range(candidates)]
+            return np.stack([path[0] for path in paths]), np.stack([path[1] for path in paths])
+        engine = MotionEngine(self.boundary, self.radius, self.dot_collisions, make_models(motion or {}),
+                              self.swept_collisions)
+        engine.reset(self.generate_locations(rng, candidates), self.generate_velocities(rng, candidates),
+                     load, rng)
+
+        shape = engine.positions.shape[:-2] + (steps + 1,) + engine.positions.shape[-2:]
+        positions = np.empty(shape)
+        velocities = np.empty(shape)
+        positions[..., 0, :, :] = engine.positions
+        velocities[..., 0, :, :] = engine.velocities
+        for step in range(1, steps + 1):
+            engine.step(self.dt)
+            positions[..., step, :, :] = engine.positions
+            velocities[..., step, :, :] = engine.velocities
+        return positions, velocities
+
+    def generate_velocities(self, rng, trials=None):
+        """Generate a velocity with the magnitude of the generator velocity
+        for every dot.
+        Args:
+            rng: the numpy Generator to draw from.
+            trials: the number of trials drawn at once or None for one.
+        Returns:
+            velocities: a (number_of_dots, 2) array, (trials, number_of_dots,
+            2) for many trials.
+        """
+        shape = (self.number_of_dots, 2) if trials is None else (trials, self.number_of_dots, 2)
+        vel = rng.uniform(-1, 1, shape)
+        normalization = np.linalg.norm(vel, axis=-1, keepdims=True)
+        return vel / normalization * self.velocity
+
+    def generate_locations(self, rng, trials=None):
+        """Generates the starting location of every dot inside the central
+        part of the boundary. The dots are at least 5 radii apart.
+        Args:
+            rng: the numpy Generator to draw from.
+            trials: the number of trials drawn at once or None for one.
+        Returns:
+            locations: a (number_of_dots, 2) array, (trials, number_of_dots,
+            2) for many trials.
+        Raises:
+            PlacementError: if the dots do not fit in the boundary.
+        """
+        width = self.boundary.WIDTH
+        height = self.boundary.HEIGHT
+        bounds = (0.1 * width, 0.1 * height, 0.9 * width, 0.9 * height)
+        if trials is not None:
+            return place_dots_batch(trials, self.number_of_dots, bounds, 5 * self.radius, rng)
+        return place_dots(self.number_of_dots, bounds, 5 * self.radius, rng)
@@ -0,0 +1,273 @@
+"""Microbenchmarks of the simulation, placement, hit-test and draw paths.
+
+    python benchmark.py [--counts 10 100 1000 10000] [--output results.json]
+                        [--baseline benchmark_baseline.json] [--threshold 1.5]
+                        [--renderer qpainter]
+
+Runs under the offscreen Qt platform. Every benchmark is timed for each dot
+count and the median time per call is compared against the baseline. The
+script exits with 1 when a benchmark is slower than threshold times its
+baseline, benchmarks without a baseline are listed. --save-baseline merges
+the results into the baseline, so runs of both renderers can be stored.
+Dot counts whose per-frame paths do not fit in the frame budget
+are reported, and fail too with --strict-budget. The draw benchmarks of a
+renderer other than matplotlib are named after it.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import matplotlib
+import numpy as np
+from PyQt5.QtWidgets import QApplication
+
+import main
+from boundarycollision import BoundaryCollisionDetector
+from constraints import make_constraints, validate
+from motionengine import MotionEngine
+from motionmodels import make_models
+from placement import place_dots
+from trajectory import TrajectoryGenerator
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+COUNTS = [10, 100, 1000, 10000]
+# Benchmarks which run on every frame and have to fit in INTERVAL together.
+FRAME_PATHS = ['update_dots', 'blit', 'blit_qpainter']
+# The constraints of the validate benchmark.
+CONSTRAINTS = {'minimum_separation': {'distance': 3 * main.RADIUS},
+               'close_encounters': {'distance': 5 * main.RADIUS, 'maximum': 4},
+               'wall_time': {'margin': 3 * main.RADIUS, 'fraction': 0.3}}
+# Times below this are dominated by noise and never count as a regression.
+NOISE_FLOOR = 0.05 # in ms
+
+
+def time_call(function, min_time=0.05, repeat=5):
+    """Times function and returns the median and minimum time per call in ms.
+    The number of calls per repeat grows until a repeat takes min_time s.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 16:
+            break
+        number *= 2
+    times = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+    return {'median_ms': float(np.median(times) * 1000), 'min_ms': float(np.min(times) * 1000),
+            'calls': number * repeat}
+
+
+class Arena:
+    """A Window whose data area grows with count so that the dots fit with
+    the spawn separation.
+    """
+    # The spawn area per dot, a few times the area a dot blocks.
+    AREA_PER_DOT = 6 * (5 * main.RADIUS)**2
+
+    def __init__(self, window, count):
+        self.window = window
+        window.setup_canvas()
+        window.grab_default_dimensions()
+        width, height = window.renderer.size()
+        scale = max(1.0, np.sqrt(count * self.AREA_PER_DOT / (0.64 * width * height)))
+        window.WIDTH = width * scale
+        window.HEIGHT = height * scale
+        window.renderer.fit(window.WIDTH, window.HEIGHT)
+        window.session_seed = 0
+        window.trajectory_generator = TrajectoryGenerator(window, count, main.RADIUS, main.VELOCITY,
+                                                          main.DT, main.DOT_COLLISIONS)
+        window.setup_dots()
+        window.draw_dots()
+        window.track_dots()
+        window.sim_clock.start()
+        self.rng = np.random.default_rng(count)
+
+    def bounds(self):
+        return (0.1 * self.window.WIDTH, 0.1 * self.window.HEIGHT,
+                0.9 * self.window.WIDTH, 0.9 * self.window.HEIGHT)
+
+    def random_event(self):
+        x, y = self.rng.uniform((0, 0), (self.window.WIDTH, self.window.HEIGHT))
+        return SimpleNamespace(xdata=x, ydata=y)
+
+
+def run(counts):
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = main.Window()
+    window.show()
+    app.processEvents()
+    results = {}
+
+    def record(name, count, function, calls=1, **kwargs):
+        result = time_call(function, **kwargs)
+        result['median_ms'] /= calls
+        result['min_ms'] /= calls
+        results.setdefault(name, {})[str(count)] = result
+        print("{:<28} {:>6} dots {:>10.4f} ms".format(name, count, results[name][str(count)]['median_ms']),
+              flush=True)
+
+    for count in counts:
+        arena = Arena(window, count)
+        positions = window.trajectory.positions[0].copy()
+        velocities = window.trajectory.velocities[0].copy()
+
+        def update_dots():
+            # Keeps the simulation time inside the trajectory so every call
+            # interpolates.
+            window.sim_clock.start()
+            window.update_dots()
+        record('update_dots', count, update_dots)
+        record('setup_dots', count, window.setup_dots, min_time=0.0)
+        constraints = make_constraints(CONSTRAINTS)
+        candidates = np.stack([window.trajectory.positions] * 4)
+        record('validate', count,
+               lambda: validate(constraints, candidates, window.trial_clicks, window), calls=len(candidates))
+        rng = np.random.default_rng(0)
+        record('place_dots', count, lambda: place_dots(count, arena.bounds(), 5 * main.RADIUS, rng),
+               min_time=0.0)
+        events = [arena.random_event() for _ in range(64)]
+        record('detect_clicked_dot', count,
+               lambda: [window.detect_clicked_dot(window.positions, event) for event in events],
+               calls=len(events))
+
+        detector = BoundaryCollisionDetector(window)
+        entities = [SimpleNamespace(center=tuple(p), radius=main.RADIUS, velocity=tuple(v))
+                    for p, v in zip(positions, velocities)]
+        record('update_velocity', count, lambda: [detector.update_velocity(e) for e in entities],
+               calls=len(entities))
+        record('update_velocities', count,
+               lambda: detector.update_velocities(positions, velocities, main.RADIUS))
+        # Every call steps from the same state, the work of a step depends
+        # on how close the dots are and they would drift apart otherwise.
+        # A reset is a few us.
+        def engine_step(engine, load=0, rng=None):
+            def step():
+                engine.reset(positions, velocities, load, rng)
+                engine.step(main.DT)
+            return step
+        for collisions in (False, True):
+            record('engine_step' + ('_collisions' if collisions else ''), count,
+                   engine_step(MotionEngine(window, main.RADIUS, collisions)))
+        record('engine_step_swept', count,
+               engine_step(MotionEngine(window, main.RADIUS, swept_collisions=True)))
+        for name, motion in main.MOTION_MODELS.items():
+            if not motion:
+                continue
+            record('engine_step_' + name, count,
+                   engine_step(MotionEngine(window, main.RADIUS, models=make_models(motion)),
+                               window.trial_clicks, np.random.default_rng(0)))
+
+        window.draw_dots()
+        if main.RENDERER == 'matplotlib':
+            record('canvas_draw', count, window.renderer.draw, min_time=0.0)
+            record('blit', count, window.renderer.blit)
+        else:
+            record('blit_' + main.RENDERER, count, window.renderer.blit)
+    window.close()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Returns the list of regressions of results against the baseline. The
+    fastest repeat is compared since it is the least affected by other load
+    on the machine.
+    """
+    failures = []
+    for name, by_count in results.items():
+        for count, result in by_count.items():
+            reference = baseline.get('results', {}).get(name, {}).get(count)
+            if (reference is not None and result['min_ms'] > NOISE_FLOOR and
+                    result['min_ms'] > threshold * reference['min_ms']):
+                failures.append("{} with {} dots: {:.4f} ms, baseline {:.4f} ms".format(
+                    name, count, result['min_ms'], reference['min_ms']))
+    return failures
+
+
+def missing_baselines(results, baseline):
+    """Returns the benchmarks and dot counts of results which the baseline
+    has no time for, they are not compared.
+    """
+    stored = baseline.get('results', {})
+    return ["{} with {} dots".format(name, count)
+            for name, by_count in results.items() for count in by_count
+            if count not in stored.get(name, {})]
+
+
+def over_budget(results, budget):
+    """Returns the dot counts whose per-frame paths take longer than budget.
+    """
+    over = []
+    for count in next(iter(results.values()), {}):
+        frame = sum(results[name][count]['median_ms'] for name in FRAME_PATHS if name in results)
+        if frame > budget:
+            over.append("frame with {} dots: {:.2f} ms over the {} ms budget".format(count, frame, budget))
+    return over
+
+
+def main_(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counts', type=int, nargs='+', default=COUNTS)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--threshold', type=float, default=1.5,
+                        help='the slowdown against the baseline which fails')
+    parser.add_argument('--strict-budget', action='store_true',
+                        help='fails when a frame does not fit in INTERVAL')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='stores the results as the new baseline')
+    parser.add_argument('--renderer', choices=['matplotlib', 'qpainter'], default=main.RENDERER)
+    args = parser.parse_args(argv)
+    main.RENDERER = args.renderer
+
+    results = run(args.counts)
+    report = {'meta': {'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                       'platform': platform.platform(),
+                       'python': platform.python_version(),
+                       'numpy': np.__version__,
+                       'matplotlib': matplotlib.__version__,
+                       'interval_ms': main.INTERVAL,
+                       'renderer': main.RENDERER},
+              'results': results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.save_baseline:
+        stored = baseline.get('results', {})
+        for name, by_count in results.items():
+            stored.setdefault(name, {}).update(by_count)
+        with open(args.baseline, 'w') as f:
+            # the draw benchmarks are named after their renderer
+            meta = {key: value for key, value in report['meta'].items() if key != 'renderer'}
+            json.dump({'meta': meta, 'results': stored}, f, indent=2)
+        return 0
+
+    for missing in missing_baselines(results, baseline):
+        print("NO BASELINE", missing)
+    failures = compare(results, baseline, args.threshold)
+    budget = over_budget(results, main.INTERVAL)
+    for failure in failures:
+        print("FAIL", failure)
+    for line in budget:
+        print("FAIL" if args.strict_budget else "OVER BUDGET", line)
+    return 1 if failures or (budget and args.strict_budget) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_())
@@ -0,0 +1,210 @@
+"""Drives full sessions of the Window under the offscreen Qt platform.
+
+    python session_driver.py [--sessions N] [--output session_timings.csv]
+
+Types a participant ID, presses "Begin Tracking" and "Next Trial", and
+clicks tracked or untracked dots through onclick/onrelease for every trial
+of TRIAL_DICTIONARY. The wall time of the trial setup, the blink and motion
+phases, the click feedback and end_trial is written per trial.
+
+The offscreen screen is 800 x 600 pixels, so the canvas is given a lower dpi
+to span the inches of a real monitor, where the dots can be placed.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import numpy as np
+from PyQt5.QtCore import Qt
+from PyQt5.QtTest import QTest
+from PyQt5.QtWidgets import QApplication
+
+import main
+from dotrenderer import PointerEvent
+
+FIELDS = ['session', 'trial', 'load', 'setup_ms', 'blink_ms', 'motion_ms',
+          'press_ms', 'release_ms', 'end_trial_ms']
+
+
+class SessionDriver:
+    """Runs scripted sessions on a Window and times every step.
+    """
+    def __init__(self, window, accuracy=0.8, seed=None, timeout=30.0, dpi=None):
+        """
+        Args:
+            window: the Window to drive, already shown.
+            accuracy: the probability that a click goes to a tracked dot.
+            seed: the seed of the choices of the scripted participant.
+            timeout: the longest wait in s for a trial to reach clicking.
+            dpi: the dpi of the canvas, the renderer default if None.
+        """
+        self.window = window
+        self.accuracy = accuracy
+        self.rng = np.random.default_rng(seed)
+        self.timeout = timeout
+        self.end_trial_ms = float('nan')
+        window.setup_canvas()
+        if dpi is not None:
+            window.renderer.set_dpi(dpi)
+
+        def placement_failed():
+            raise RuntimeError(window.placement_message.text())
+        window.placement_message.exec_ = placement_failed
+        end_trial = window.end_trial
+
+        def timed_end_trial():
+            start = time.perf_counter()
+            end_trial()
+            self.end_trial_ms = (time.perf_counter() - start) * 1000
+        window.end_trial = timed_end_trial
+
+    def run_session(self, participant):
+        """Runs every trial of a session.
+        Returns:
+            rows: a list of dictionaries with the FIELDS but session.
+        """
+        window = self.window
+        window.text_field.clear()
+        QTest.keyClicks(window.text_field, participant)
+        QTest.mouseClick(window.track_button, Qt.LeftButton)
+        rows = []
+        for trial in sorted(window.trial_dictionary):
+            rows.append(self.run_trial(trial))
+        return rows
+
+    def run_trial(self, trial):
+        window = self.window
+        self.end_trial_ms = float('nan')
+        start = time.perf_counter()
+        QTest.mouseClick(window.next_button, Qt.LeftButton)
+        setup_ms = (time.perf_counter() - start) * 1000
+        while not window.clicking_active:
+            QTest.qWait(1)
+            if time.perf_counter() - start > self.timeout:
+                raise RuntimeError("Trial {} did not reach the clicking phase.".format(trial))
+
+        load = window.trial_clicks
+        press_times = []
+        release_times = []
+        clicked = []
+        for _ in range(load):
+            dot = self.choose_dot(clicked)
+            clicked.append(dot)
+            press, release = self.click(dot)
+            press_times.append(press)
+            release_times.append(release)
+        timer = window.frame_timer
+        return {'trial': trial,
+                'load': load,
+                'setup_ms': setup_ms,
+                'blink_ms': timer.phase_duration('blink', 'motion'),
+                'motion_ms': timer.phase_duration('motion', 'clicking'),
+                'press_ms': np.mean(press_times),
+                'release_ms': np.mean(release_times),
+                'end_trial_ms': self.end_trial_ms}
+
+    def choose_dot(self, clicked):
+        window = self.window
+        tracked = [dot for dot in window.tracked_dots if dot not in clicked]
+        untracked = [dot for dot in range(len(window.positions))
+                     if dot not in window.tracked_dots and dot not in clicked]
+        if not untracked or (tracked and self.rng.random() < self.accuracy):
+            return self.rng.choice(tracked)
+        return self.rng.choice(untracked)
+
+    def click(self, dot):
+        """Presses and releases the mouse on the center of a dot.
+        Returns:
+            press_ms, release_ms: the time spent in onclick and onrelease.
+        """
+        window = self.window
+        x, y = window.positions[dot]
+        times = []
+        for handler in (window.onclick, window.onrelease):
+            event = PointerEvent(x, y)
+            start = time.perf_counter()
+            handler(event)
+            times.append((time.perf_counter() - start) * 1000)
+        return times
+
+
+def open_window(accuracy=0.8, seed=None, dpi=None):
+    """Shows a new Window and waits until it is exposed.
+    Returns:
+        window, driver: the Window and a SessionDriver on it.
+    """
+    window = main.Window()
+    window.show()
+    QTest.qWaitForWindowExposed(window)
+    QTest.qWait(50)
+    return window, SessionDriver(window, accuracy, seed, dpi=dpi)
+
+
+def write_rows(f, session, rows):
+    for row in rows:
+        row = dict(row, session=session)
+        f.write(",".join(format(row[field], '.3f') if isinstance(row[field], float)
+                         else str(row[field]) for field in FIELDS))
+        f.write('\n')
+
+
+def main_(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=1)
+    parser.add_argument('--output', default='session_timings.csv')
+    parser.add_argument('--accuracy', type=float, default=0.8,
+                        help='the probability that a click goes to a tracked dot')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seeds the sessions and the scripted clicks')
+    parser.add_argument('--dpi', type=float, default=50,
+                        help='the canvas dpi, 50 makes the offscreen screen '
+                             'about 16 x 12 inches')
+    parser.add_argument('--renderer', choices=['matplotlib', 'qpainter'], default=main.RENDERER)
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help='scales the blink and trial durations, below 1 '
+                             'runs sessions faster than the real task')
+    parser.add_argument('--session-directory', default=None,
+                        help='where the sessions are written, a temporary '
+                             'directory by default')
+    parser.add_argument('--reuse-window', action='store_true',
+                        help='runs every session in the same Window')
+    args = parser.parse_args(argv)
+
+    main.BLINKING_DURATION *= args.time_scale
+    main.TRIAL_DURATION *= args.time_scale
+    main.SESSION_DIRECTORY = args.session_directory or tempfile.mkdtemp(prefix='dottrack_')
+    main.RENDERER = args.renderer
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = driver = None
+    with open(args.output, 'w') as f:
+        f.write(",".join(FIELDS))
+        f.write('\n')
+        for session in range(args.sessions):
+            if window is None or not args.reuse_window:
+                if window is not None:
+                    window.close()
+                window, driver = open_window(args.accuracy,
+                                             None if args.seed is None else args.seed + session,
+                                             args.dpi)
+            if args.seed is not None:
+                main.SESSION_SEED = args.seed + session
+            start = time.perf_counter()
+            rows = driver.run_session('driver{:04d}'.format(session))
+            write_rows(f, session, rows)
+            f.flush()
+            print("session {} took {:.1f} s, setup {:.2f} ms, release {:.2f} ms, end_trial {:.2f} ms".format(
+                session, time.perf_counter() - start,
+                np.mean([row['setup_ms'] for row in rows]),
+                np.mean([row['release_ms'] for row in rows]), rows[-1]['end_trial_ms']), flush=True)
+    window.close()
+    app.processEvents()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_())
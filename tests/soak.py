@@ -0,0 +1,201 @@
+"""Runs many sessions in one process and fails when resources leak.
+
+    python soak.py [--sessions 200] [--new-window-every 10] [--time-scale 0.02]
+                   [--output soak.csv]
+
+The stations run all day without a restart, so whatever a session leaves
+behind adds up. Sessions are driven by a SessionDriver under the offscreen
+Qt platform, in the same Window like on a station, and every few sessions
+the Window is closed and a new one opened. After every session the garbage
+is collected and the process is measured: RSS, the memory traced by
+tracemalloc, the live matplotlib artists and animations, the QTimers, the
+handlers connected to the canvas, the windows, the threads and the open
+files. The growth from the end of the warm up sessions to the last session
+is compared against the thresholds and the script exits with 1 when one is
+exceeded. The allocations which grew most are printed from tracemalloc
+snapshots.
+"""
+import argparse
+import gc
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from PyQt5.QtCore import QEvent, QTimer
+from PyQt5.QtWidgets import QApplication
+
+import main
+from session_driver import open_window
+
+FIELDS = ['session', 'seconds', 'rss_mb', 'traced_mb', 'artists', 'animations',
+          'timers', 'callbacks', 'windows', 'threads', 'files']
+# The largest growth of every measure over the soak, counts must not grow.
+THRESHOLDS = {'rss_mb': 20.0, 'traced_mb': 2.0, 'artists': 0, 'animations': 0,
+              'timers': 0, 'callbacks': 0, 'windows': 0, 'threads': 0, 'files': 0}
+
+
+def rss_mb():
+    """Returns the resident set size of the process in MB, the peak one where
+    /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+
+
+def open_files():
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return 0
+
+
+def count_live(*types):
+    """Counts the objects tracked by the garbage collector of the types.
+    """
+    types = tuple(t for t in types if t is not None)
+    if not types:
+        return 0
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, types))
+
+
+def count_callbacks(window):
+    """Counts the handlers connected to the events of the canvas of window.
+    """
+    renderer = window.renderer
+    if renderer is None:
+        return 0
+    if hasattr(renderer, 'handlers'):
+        return len(renderer.handlers)
+    return sum(len(callbacks) for callbacks in renderer.canvas.callbacks.callbacks.values())
+
+
+def measure(app, window):
+    """Deletes the Qt objects scheduled for deletion, collects the garbage
+    and returns the measures but seconds and session, the callbacks are the
+    ones of window.
+    """
+    for _ in range(3):
+        app.processEvents()
+        app.sendPostedEvents(None, QEvent.DeferredDelete)
+    gc.collect()
+    # matplotlib is only loaded by its renderer
+    artist = getattr(sys.modules.get('matplotlib.artist'), 'Artist', None)
+    animation = getattr(sys.modules.get('matplotlib.animation'), 'Animation', None)
+    return {'rss_mb': rss_mb(),
+            'traced_mb': tracemalloc.get_traced_memory()[0] / 2**20,
+            'artists': count_live(artist),
+            'animations': count_live(animation),
+            'timers': count_live(QTimer),
+            'callbacks': count_callbacks(window),
+            'windows': count_live(main.Window),
+            'threads': threading.active_count(),
+            'files': open_files()}
+
+
+def check_growth(rows, warm_up):
+    """Compares the last row against the last warm up row.
+    Returns:
+        failures: a list of messages, one per exceeded threshold.
+    """
+    baseline = rows[min(warm_up, len(rows)) - 1]
+    failures = []
+    for field, threshold in THRESHOLDS.items():
+        growth = rows[-1][field] - baseline[field]
+        if growth > threshold:
+            failures.append("{} grew by {:.6g} from {:.6g} after session {}, the threshold is {:.6g}".format(
+                field, growth, baseline[field], baseline['session'], threshold))
+    return failures
+
+
+def print_top_growth(before, after, limit=10):
+    print("Largest allocation growth:")
+    for stat in after.compare_to(before, 'lineno')[:limit]:
+        print("  {}".format(stat))
+
+
+def main_(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--warm-up', type=int, default=5,
+                        help='sessions run before the baseline is measured')
+    parser.add_argument('--new-window-every', type=int, default=10,
+                        help='closes the Window and opens a new one every that '
+                             'many sessions, 0 keeps one Window')
+    parser.add_argument('--time-scale', type=float, default=0.02,
+                        help='scales the blink and trial durations')
+    parser.add_argument('--renderer', choices=['matplotlib', 'qpainter'], default=main.RENDERER)
+    parser.add_argument('--dpi', type=float, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--frames', type=int, default=1,
+                        help='the number of frames tracemalloc keeps per allocation')
+    parser.add_argument('--output', default='soak.csv')
+    for field, threshold in THRESHOLDS.items():
+        parser.add_argument('--max-' + field.replace('_', '-'), type=type(threshold), default=threshold,
+                            dest=field, help='the largest growth of ' + field)
+    args = parser.parse_args(argv)
+    for field in THRESHOLDS:
+        THRESHOLDS[field] = getattr(args, field)
+
+    main.BLINKING_DURATION *= args.time_scale
+    main.TRIAL_DURATION *= args.time_scale
+    main.SESSION_DIRECTORY = tempfile.mkdtemp(prefix='dottrack_soak_')
+    main.RENDERER = args.renderer
+    app = QApplication.instance() or QApplication(sys.argv)
+    tracemalloc.start(args.frames)
+    window = driver = None
+    rows = []
+    snapshot = None
+    with open(args.output, 'w') as f:
+        f.write(",".join(FIELDS))
+        f.write('\n')
+        for session in range(args.sessions):
+            start = time.perf_counter()
+            if window is None or (args.new_window_every and session % args.new_window_every == 0):
+                if window is not None:
+                    window.close()
+                    window.deleteLater()
+                # the old Window is only released when nothing refers to it
+                window = driver = None
+                window, driver = open_window(seed=args.seed + session, dpi=args.dpi)
+            main.SESSION_SEED = args.seed + session
+            driver.run_session('soak{:04d}'.format(session))
+            if session == args.warm_up - 1:
+                # the snapshot stays in memory, so it is part of the baseline
+                snapshot = tracemalloc.take_snapshot()
+            row = dict(measure(app, window), session=session, seconds=time.perf_counter() - start)
+            rows.append(row)
+            f.write(",".join(format(row[field], '.3f') if isinstance(row[field], float)
+                             else str(row[field]) for field in FIELDS))
+            f.write('\n')
+            f.flush()
+            print("session {} took {:.1f} s, rss {:.1f} MB, traced {:.2f} MB, {} artists, "
+                  "{} timers, {} windows".format(session, row['seconds'], row['rss_mb'],
+                                                 row['traced_mb'], row['artists'],
+                                                 row['timers'], row['windows']), flush=True)
+    window.close()
+    window = driver = None
+    app.processEvents()
+
+    if snapshot is not None:
+        print_top_growth(snapshot, tracemalloc.take_snapshot())
+    failures = check_growth(rows, args.warm_up)
+    for failure in failures:
+        print("FAIL " + failure)
+    if not failures:
+        print("No growth above the thresholds over {} sessions.".format(len(rows)))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_())
@@ -0,0 +1,43 @@
+"""Checks the capacity estimate of analyze.py.
+
+    python -m pytest test_analyze.py
+"""
+import math
+import os
+import sys
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import pytest
+
+from analyze import capacity
+
+
+@pytest.mark.parametrize('load', [1, 2, 3, 4, 5])
+def test_all_correct_is_the_load(load):
+    assert capacity(load, load, 10) == pytest.approx(load)
+
+
+def test_zero_correct_without_a_solution_is_nan():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assert math.isnan(capacity(0, 5, 10))
+        assert math.isnan(capacity(1, 6, 10))
+
+
+def test_zero_correct_below_guessing_is_zero():
+    # guessing finds 2 * 2 / 10 targets, no clicks right is worse
+    assert capacity(0, 2, 10) == 0
+
+
+@pytest.mark.parametrize('load', [1, 2, 3, 4, 5])
+def test_estimates_stay_in_range(load):
+    for correct in [x / 10 for x in range(10 * load + 1)]:
+        k = capacity(correct, load, 10)
+        assert math.isnan(k) or 0 <= k <= load
+
+
+def test_guessing_is_zero():
+    # guessing all clicks among 10 dots finds load^2 / 10 targets
+    assert capacity(3 * 3 / 10, 3, 10) == pytest.approx(0)
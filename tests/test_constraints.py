@@ -0,0 +1,87 @@
+"""Checks the pruned distance checks of constraints.py against all pairs.
+
+    python -m pytest test_constraints.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import numpy as np
+import pytest
+
+import constraints
+from constraints import CloseEncounters, ConstraintError, MinimumSeparation, tracked_distances
+from trajectory import TrajectoryGenerator
+
+
+class Boundary:
+    WIDTH = 20
+    HEIGHT = 20
+
+
+def candidates(dots, count=8, steps=100, seed=0):
+    """Simulates count candidate trajectories of dots like a trial.
+    """
+    generator = TrajectoryGenerator(Boundary(), dots, 0.3, 3, 0.01)
+    positions, _ = generator.simulate(np.random.default_rng(seed), steps, candidates=count)
+    return positions
+
+
+def all_pair_distances(positions, load):
+    """Returns the (candidates, frames, pairs) distances of every tracked
+    dot to every other dot, each pair once.
+    """
+    dots = positions.shape[2]
+    pairs = [(i, j) for i in range(load) for j in range(i + 1, dots)]
+    first, second = np.array(pairs).T
+    return np.linalg.norm(positions[:, :, first] - positions[:, :, second], axis=-1)
+
+
+@pytest.fixture(params=[constraints.CHUNK_SIZE, 64])
+def chunk_size(request, monkeypatch):
+    """Runs a test with whole and with many small chunks of frames.
+    """
+    monkeypatch.setattr(constraints, 'CHUNK_SIZE', request.param)
+    return request.param
+
+
+@pytest.mark.parametrize('dots, load', [(10, 2), (30, 5), (30, 30)])
+@pytest.mark.parametrize('distance', [0.5, 1.5, 4.0])
+def test_minimum_separation_matches_all_pairs(chunk_size, dots, load, distance):
+    positions = candidates(dots)
+    closest = all_pair_distances(positions, load).min(axis=(1, 2))
+    valid = MinimumSeparation(distance).check(positions, load, Boundary())
+    assert np.array_equal(valid, closest >= distance)
+
+
+@pytest.mark.parametrize('dots, load', [(10, 2), (30, 5), (30, 30)])
+@pytest.mark.parametrize('distance', [0.5, 1.5, 4.0])
+def test_close_encounters_match_all_pairs(chunk_size, dots, load, distance):
+    positions = candidates(dots)
+    close = all_pair_distances(positions, load) < distance
+    encounters = close[:, 0].sum(axis=-1) + (close[:, 1:] & ~close[:, :-1]).sum(axis=(1, 2))
+    # the valid candidates only change at the counts themselves
+    for maximum in np.unique(np.concatenate([encounters - 1, encounters]).clip(0)):
+        valid = CloseEncounters(distance, maximum).check(positions, load, Boundary())
+        assert np.array_equal(valid, encounters <= maximum)
+
+
+@pytest.mark.parametrize('reach', [0.5, 2.0])
+def test_pruned_pairs_stay_out_of_reach(chunk_size, reach):
+    positions = candidates(30)
+    load = 5
+    closest = np.full(len(positions), np.inf)
+    for distances in tracked_distances(positions, load, reach):
+        np.minimum(closest, distances.min(axis=(1, 2, 3), initial=np.inf), out=closest)
+    brute = all_pair_distances(positions, load).min(axis=(1, 2))
+    # the pairs left out never come within reach, the kept ones are exact
+    assert np.array_equal(np.minimum(closest, reach), np.minimum(brute, reach))
+    assert np.all(closest[brute < reach] == brute[brute < reach])
+
+
+def test_generate_gives_up_after_the_time_budget():
+    generator = TrajectoryGenerator(Boundary(), 10, 0.3, 3, 0.01, constraints=[MinimumSeparation(100)],
+                                    max_candidates=10 ** 9, time_budget=0.05)
+    with pytest.raises(ConstraintError, match='within 0.05 s'):
+        generator.generate(0, 0, 100, load=2)
@@ -0,0 +1,75 @@
+"""Checks that replay.frame_states shows the colors of a recorded trial.
+
+    python -m pytest test_replay.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import numpy as np
+
+from dotrenderer import NORMAL, BLINKING, SELECTED, UNSELECTED
+from recorder import SessionRecorder, PRESS, RELEASE, NO_SELECTION, CORRECT, load_trial
+from replay import frame_states
+from trajectory import Trajectory
+
+FPS = 100
+INTERVAL = 0.03 # s between two recorded frames
+
+
+def record_trial(directory, events):
+    """Records a trial of 3 dots, dot 0 tracked, like the Window does: the
+    dot blinks for 10 frames, then all dots move for 10 frames, then the
+    clicking frame is shown.
+    Args:
+        events: a list of (time, kind, dot, outcome) events.
+    Returns:
+        arrays: the arrays of the saved trial.
+    """
+    recorder = SessionRecorder(str(directory), 32)
+    recorder.start_session('test', {})
+    positions = np.tile(np.array([[1.0, 1.0], [3.0, 1.0], [5.0, 1.0]]), (21, 1, 1))
+    positions[:, :, 1] += np.arange(21)[:, None] * 0.1
+    recorder.start_trial(0, Trajectory(positions, np.zeros_like(positions), 0), [0])
+    for i in range(21):
+        phase = 'blink' if i < 10 else 'motion' if i < 20 else 'clicking'
+        colors = np.full(3, NORMAL, dtype=np.uint8)
+        if phase == 'blink':
+            colors[0] = NORMAL if i % 2 else BLINKING
+        recorder.record_frame(i * INTERVAL, phase, positions[i], colors)
+    for t, kind, dot, outcome in events:
+        x, y = positions[-1, dot]
+        recorder.record_event(t, kind, x, y, dot, outcome)
+    path = recorder.finish_trial().result()
+    recorder.close()
+    return load_trial(path, mmap=False)
+
+
+def test_presses_before_clicking_keep_the_recorded_colors(tmp_path):
+    clicking = 20 * INTERVAL
+    arrays = record_trial(tmp_path, [(0.05, PRESS, 0, NO_SELECTION),
+                                     (0.07, RELEASE, 0, NO_SELECTION),
+                                     (0.40, PRESS, 1, NO_SELECTION),
+                                     (0.42, RELEASE, 1, NO_SELECTION)])
+    positions, colors = frame_states(arrays, FPS)
+    times = np.arange(len(colors)) / FPS
+    shown = np.maximum(np.searchsorted(arrays['frame_times'], times, side='right') - 1, 0)
+    assert np.array_equal(colors[times < clicking], arrays['frame_colors'][shown[times < clicking]])
+    assert set(colors[times < 10 * INTERVAL, 0]) == {NORMAL, BLINKING}
+    assert np.all(colors[times >= clicking] == NORMAL)
+
+
+def test_clicks_after_clicking_starts_recolor_the_dots(tmp_path):
+    clicking = 20 * INTERVAL
+    arrays = record_trial(tmp_path, [(0.40, PRESS, 1, NO_SELECTION),
+                                     (0.42, RELEASE, 1, NO_SELECTION),
+                                     (clicking + 0.1, PRESS, 0, NO_SELECTION),
+                                     (clicking + 0.2, RELEASE, 0, CORRECT)])
+    positions, colors = frame_states(arrays, FPS)
+    times = np.arange(len(colors)) / FPS
+    assert np.all(colors[(times >= clicking) & (times < clicking + 0.1)] == NORMAL)
+    assert np.all(colors[(times >= clicking + 0.1) & (times < clicking + 0.2), 0] == SELECTED)
+    assert np.all(colors[times >= clicking + 0.2, 0] == BLINKING)
+    # every tracked dot was clicked, so none is marked unselected
+    assert not np.any(colors == UNSELECTED)
@@ -0,0 +1,63 @@
+"""Checks that ResultWriter writes its lines and reports a failed thread.
+
+    python -m pytest test_resultwriter.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import pytest
+
+from resultwriter import ResultWriter, ResultWriteError
+
+
+def failed_writer(directory, **kwargs):
+    """Returns a writer whose thread failed to open a file.
+    """
+    writer = ResultWriter(str(directory / 'missing'), **kwargs)
+    writer.write('results.csv', 'lost')
+    writer.thread.join(5)
+    assert not writer.thread.is_alive()
+    return writer
+
+
+def test_lines_are_written_on_close(tmp_path):
+    writer = ResultWriter(str(tmp_path), flush_every=10, max_queue=2)
+    for i in range(100):
+        writer.write('results.csv', str(i))
+    writer.close()
+    assert (tmp_path / 'results.csv').read_text().split() == [str(i) for i in range(100)]
+    # closing again only waits for the thread
+    writer.close()
+
+
+def test_write_raises_once_the_thread_failed(tmp_path):
+    writer = failed_writer(tmp_path)
+    assert isinstance(writer.error, FileNotFoundError)
+    with pytest.raises(ResultWriteError, match='no longer written'):
+        writer.write('results.csv', 'more')
+
+
+def test_close_does_not_hang_once_the_thread_failed(tmp_path):
+    writer = failed_writer(tmp_path, max_queue=1)
+    writer.queue.put_nowait(('results.csv', 'stuck'))
+    writer.overflow.append(('results.csv', 'waiting'))
+    start = time.monotonic()
+    with pytest.raises(ResultWriteError):
+        writer.close(timeout=1.0)
+    assert time.monotonic() - start < 1.0
+
+
+def test_close_gives_up_after_the_timeout(tmp_path):
+    writer = ResultWriter(str(tmp_path), max_queue=1)
+    # a thread which stopped reading without an error
+    writer.queue.put(None)
+    writer.thread.join(5)
+    writer.write('results.csv', 'first')
+    writer.write('results.csv', 'second')
+    start = time.monotonic()
+    with pytest.raises(ResultWriteError, match='not written within'):
+        writer.close(timeout=0.2)
+    assert time.monotonic() - start < 1.0
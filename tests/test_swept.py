@@ -0,0 +1,81 @@
+"""Checks the swept boundary collisions of MotionEngine against a fine-step
+reference.
+
+    python -m pytest test_swept.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import numpy as np
+import pytest
+
+from motionengine import MotionEngine
+
+RADIUS = 0.3
+SPEED = 40 # in data units / s, fast enough to bounce several times a step
+DURATION = 0.5 # in s
+REFERENCE_DT = 1e-5 # in s, a bounce is off by at most SPEED * REFERENCE_DT
+TOLERANCE = 5e-3 # in data units
+
+
+class Boundary:
+    WIDTH = 10.0
+    HEIGHT = 6.0
+
+
+def start(dots=50, seed=0):
+    rng = np.random.default_rng(seed)
+    positions = rng.uniform((RADIUS, RADIUS), (Boundary.WIDTH - RADIUS, Boundary.HEIGHT - RADIUS), (dots, 2))
+    angles = rng.uniform(0, 2 * np.pi, dots)
+    return positions, np.c_[np.cos(angles), np.sin(angles)] * SPEED
+
+
+def run(positions, velocities, dt, swept=True):
+    engine = MotionEngine(Boundary(), RADIUS, swept_collisions=swept)
+    engine.reset(positions, velocities)
+    for _ in range(int(round(DURATION / dt))):
+        engine.step(dt)
+    return engine
+
+
+@pytest.fixture(scope='module')
+def reference():
+    return run(*start(), REFERENCE_DT, swept=False)
+
+
+@pytest.mark.parametrize('dt', [0.001, 0.01, 0.05, 0.1, 0.25, 0.5])
+def test_swept_steps_match_the_reference(reference, dt):
+    engine = run(*start(), dt)
+    assert np.abs(engine.positions - reference.positions).max() < TOLERANCE
+    assert np.abs(engine.velocities - reference.velocities).max() < 1e-9
+
+
+@pytest.mark.parametrize('dt', [0.01, 0.1, 0.5])
+def test_swept_steps_stay_inside_at_full_speed(dt):
+    engine = MotionEngine(Boundary(), RADIUS, swept_collisions=True)
+    engine.reset(*start())
+    for _ in range(int(round(DURATION / dt))):
+        engine.step(dt)
+        assert np.all(engine.positions >= RADIUS - 1e-9)
+        assert np.all(engine.positions <= np.array([Boundary.WIDTH, Boundary.HEIGHT]) - RADIUS + 1e-9)
+        assert np.allclose(np.linalg.norm(engine.velocities, axis=-1), SPEED)
+
+
+def test_overlap_steps_miss_the_reference(reference):
+    # the comparison tells the swept path from the overlap check
+    engine = run(*start(), 0.1, swept=False)
+    assert np.abs(engine.positions - reference.positions).max() > 100 * TOLERANCE
+
+
+def test_batched_trials_match_single_ones():
+    trials = [start(seed=seed) for seed in range(3)]
+    engine = MotionEngine(Boundary(), RADIUS, swept_collisions=True)
+    engine.reset(np.stack([p for p, _ in trials]), np.stack([v for _, v in trials]))
+    for _ in range(50):
+        engine.step(0.01)
+    for i, (positions, velocities) in enumerate(trials):
+        single = run(positions, velocities, 0.01)
+        assert np.array_equal(engine.positions[i], single.positions)
+        assert np.array_equal(engine.velocities[i], single.velocities)